@@ -0,0 +1,169 @@
+"""Broadcast throughput benchmark against a local fake Bot API server.
+
+Runs a users job (and a groups job with --groups) through
+BroadcastManager._run with the database kept in memory, so checkpointing,
+recipient marking and progress edits are measured too.
+
+Usage:
+    python -m benchmarks.broadcast_benchmark --recipients 10000
+    python -m benchmarks.broadcast_benchmark --recipients 100000 --groups 1000 --server-limit 30
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from array import array
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from bot.database.models import BroadcastJob, BroadcastTarget, BroadcastStatus, DeliveryStatus
+from bot.services.broadcast_jobs import BroadcastManager
+from bot.services.broadcaster import Broadcaster
+from bot.services.outbound import OutboundScheduler
+from bot.services.rate_limiter import RateLimiter
+from benchmarks.fake_bot_api import FakeBotAPI
+from benchmarks.fake_database import InMemoryDatabase
+
+
+def percentile(values: array, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run_benchmark(args: argparse.Namespace) -> bool:
+    server = FakeBotAPI(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        global_limit=args.server_limit,
+        blocked_every=args.blocked_every,
+        kicked_every=args.kicked_every
+    )
+    url = await server.start()
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(url))
+    bot = Bot(token="123456:BENCHMARK", session=session)
+    session.middleware(OutboundScheduler(RateLimiter(global_rate=args.rate)))
+    broadcaster = Broadcaster(workers=args.workers, max_retries=3)
+
+    # The whole job path of a real broadcast - checkpoints, recipient marking,
+    # progress edits and the final report - with the database kept in memory.
+    # Users and groups are separate jobs, as they are in the bot
+    runs = []
+    targets = [(BroadcastTarget.USERS, array('q', range(1, args.recipients + 1)))]
+    if args.groups:
+        targets.append((BroadcastTarget.GROUPS, array('q', range(-1, -args.groups - 1, -1))))
+    for job_id, (target, chat_ids) in enumerate(targets, start=1):
+        job = BroadcastJob(
+            id=job_id,
+            target=target,
+            from_chat_id=1,
+            message_id=1,
+            message_ids=list(range(1, args.album + 1)) if args.album > 1 else None,
+            status_chat_id=1,
+            status_message_id=1
+        )
+        runs.append((job, chat_ids, InMemoryDatabase(job, chat_ids)))
+
+    latencies = array('d')
+
+    def timed(make_sender):
+        def timed_sender(job: BroadcastJob, render=None):
+            send = make_sender(job, render)
+
+            async def timed_send(chat_id: int):
+                started = time.perf_counter()
+                try:
+                    return await send(chat_id)
+                finally:
+                    latencies.append(time.perf_counter() - started)
+
+            return timed_send
+
+        return timed_sender
+
+    started = time.perf_counter()
+    for job, _, db in runs:
+        manager = BroadcastManager(bot, db, broadcaster, progress_interval=args.progress_interval)
+        manager.make_sender = timed(manager.make_sender)
+        await manager._run(job.id)
+    elapsed = time.perf_counter() - started
+
+    await bot.session.close()
+    await server.stop()
+
+    total = sum(len(chat_ids) for _, chat_ids, _ in runs)
+    print(f"Recipients:      {total} ({args.recipients} users, {args.groups} groups)")
+    print(f"Workers / rate:  {args.workers} / {args.rate:g} msg/s")
+    print(f"Elapsed:         {elapsed:.2f} s")
+    print(f"Throughput:      {total / elapsed:.1f} msg/s")
+    print(f"API requests:    {server.requests} ({server.flood_waits} answered with 429)")
+    print(f"Send latency:    p50 {percentile(latencies, 0.50) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"mean {statistics.fmean(latencies) * 1000 if latencies else 0:.1f} ms")
+
+    # Correctness: every reachable chat got exactly one message, every result
+    # was checkpointed exactly once, blocked users were marked unreachable and
+    # kicked groups deactivated - each only by the job of its own target
+    ok = True
+    for job, chat_ids, db in runs:
+        expected_dead = {c for c in chat_ids if server.is_blocked(c) or server.is_kicked(c)}
+        duplicates = sum(1 for c in chat_ids if server.delivered[c] > 1)
+        missing = sum(1 for c in chat_ids if c not in expected_dead and server.delivered[c] == 0)
+        failed = {c for c, (status, _, _) in db.deliveries.items() if status == DeliveryStatus.FAILED}
+        other_errors = len(failed - expected_dead)
+        if job.target == BroadcastTarget.USERS:
+            marked, wrongly_marked = db.users_unreachable, db.groups_deactivated
+        else:
+            marked, wrongly_marked = db.groups_deactivated, db.users_unreachable
+        misclassified = len(marked ^ expected_dead) + len(wrongly_marked)
+        unsaved = sum(1 for c in chat_ids if db.saved[c] != 1)
+        no_copies = sum(
+            1 for status, _, message_ids in db.deliveries.values()
+            if status == DeliveryStatus.SENT and not message_ids
+        )
+
+        print(f"\n{job.target.value.capitalize()} job:")
+        print(f"  Status:        {job.status.value}, {job.sent} sent, {job.failed} failed")
+        print(f"  Failed:        {len(failed)} ({len(marked)} marked, {other_errors} other)")
+        print(f"  Checkpoints:   {db.checkpoints} ({unsaved} results not saved exactly once)")
+        print(f"  Duplicates:    {duplicates}")
+        print(f"  Missing:       {missing}")
+        print(f"  Misclassified: {misclassified}")
+
+        ok = ok and (
+            job.status == BroadcastStatus.COMPLETED
+            and job.sent + job.failed == len(chat_ids)
+            and duplicates == 0 and missing == 0 and misclassified == 0 and other_errors == 0
+            and unsaved == 0 and no_copies == 0
+        )
+
+    # Progress edits plus one final report per job
+    status_edits = server.calls["editmessagetext"]
+    print(f"\nStatus edits:    {status_edits}")
+    ok = ok and status_edits >= len(runs)
+    print("Result:          " + ("OK" if ok else "FAILED"))
+    return ok
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=10000, help="synthetic private chats")
+    parser.add_argument("--groups", type=int, default=0, help="synthetic group chats")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=1000, help="client global rate limit, msg/s")
+    parser.add_argument("--album", type=int, default=0, help="broadcast an album of N media (copy_messages)")
+    parser.add_argument("--latency", type=float, default=30, help="server latency, ms")
+    parser.add_argument("--jitter", type=float, default=10, help="server latency stddev, ms")
+    parser.add_argument("--server-limit", type=int, default=None, help="requests/s before the server answers 429")
+    parser.add_argument("--blocked-every", type=int, default=20, help="every Nth user blocked the bot (0 = none)")
+    parser.add_argument("--kicked-every", type=int, default=10, help="every Nth group kicked the bot (0 = none)")
+    parser.add_argument("--progress-interval", type=float, default=2.0, help="seconds between progress edits")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(run_benchmark(parse_args()))
+    sys.exit(0 if ok else 1)
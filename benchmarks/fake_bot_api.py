@@ -0,0 +1,127 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Optional
+from aiohttp import web
+
+
+class FakeBotAPI:
+    """Local stand-in for the Telegram Bot API used by broadcast benchmarks.
+
+    Simulates network latency, 429 flood waits when the global limit is
+    exceeded, users that blocked the bot and groups that kicked it.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.03,
+        jitter: float = 0.01,
+        global_limit: Optional[int] = None,
+        retry_after: int = 1,
+        blocked_every: int = 0,
+        kicked_every: int = 0,
+        seed: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.global_limit = global_limit
+        self.retry_after = retry_after
+        self.blocked_every = blocked_every
+        self.kicked_every = kicked_every
+        self.random = random.Random(seed)
+
+        self.delivered: Counter = Counter()
+        self.calls: Counter = Counter()  # Requests by lowercased method name
+        self.requests = 0
+        self.flood_waits = 0
+        self._window_start = 0.0
+        self._window_count = 0
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    def is_blocked(self, chat_id: int) -> bool:
+        return chat_id > 0 and self.blocked_every > 0 and chat_id % self.blocked_every == 0
+
+    def is_kicked(self, chat_id: int) -> bool:
+        return chat_id < 0 and self.kicked_every > 0 and -chat_id % self.kicked_every == 0
+
+    def _over_limit(self) -> bool:
+        if not self.global_limit:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        return self._window_count > self.global_limit
+
+    @staticmethod
+    def _error(code: int, description: str, **parameters) -> web.Response:
+        body = {"ok": False, "error_code": code, "description": description}
+        if parameters:
+            body["parameters"] = parameters
+        return web.json_response(body, status=code)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        data = await request.post()
+
+        delay = max(0.0, self.random.gauss(self.latency, self.jitter))
+        await asyncio.sleep(delay)
+
+        if self._over_limit():
+            self.flood_waits += 1
+            return self._error(
+                429,
+                f"Too Many Requests: retry after {self.retry_after}",
+                retry_after=self.retry_after
+            )
+
+        chat_id = int(data.get("chat_id", 0))
+        if self.is_blocked(chat_id):
+            return self._error(403, "Forbidden: bot was blocked by the user")
+        if self.is_kicked(chat_id):
+            return self._error(403, "Forbidden: bot was kicked from the group chat")
+
+        if method == "copymessage":
+            self.delivered[chat_id] += 1
+            self._message_id += 1
+            return web.json_response({"ok": True, "result": {"message_id": self._message_id}})
+        if method == "sendmessage":
+            self.delivered[chat_id] += 1
+            self._message_id += 1
+            message = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+                "text": data.get("text", "")
+            }
+            return web.json_response({"ok": True, "result": message})
+        if method == "copymessages":
+            self.delivered[chat_id] += 1
+            count = len(json.loads(data.get("message_ids", "[]")))
+            result = [{"message_id": self._message_id + i + 1} for i in range(count)]
+            self._message_id += count
+            return web.json_response({"ok": True, "result": result})
+        return web.json_response({"ok": True, "result": True})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start the server and return its base url"""
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
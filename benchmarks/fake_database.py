@@ -0,0 +1,77 @@
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Optional
+from bot.database.models import BroadcastJob, BroadcastStatus, DeliveryStatus
+
+
+class InMemoryDatabase:
+    """Stand-in for the Database methods BroadcastManager._run calls.
+
+    Keeps one job and its deliveries in memory and records every write,
+    so the benchmark can check checkpoints and recipient marking.
+    """
+
+    def __init__(self, job: BroadcastJob, chat_ids: Iterable[int]):
+        self.job = job
+        self.deliveries: dict[int, tuple[DeliveryStatus, Optional[str], Optional[list[int]]]] = {
+            chat_id: (DeliveryStatus.PENDING, None, None) for chat_id in chat_ids
+        }
+        job.total = len(self.deliveries)
+        job.sent = job.failed = 0
+        job.status = BroadcastStatus.PENDING
+        # chat_id -> how many times its result was checkpointed
+        self.saved: Counter = Counter()
+        self.checkpoints = 0
+        self.users_unreachable: set[int] = set()
+        self.groups_deactivated: set[int] = set()
+
+    async def get_broadcast_job(self, job_id: int) -> Optional[BroadcastJob]:
+        return self.job if job_id == self.job.id else None
+
+    async def set_broadcast_job_status(
+        self,
+        job_id: int,
+        status: BroadcastStatus,
+        from_statuses: Optional[Iterable[BroadcastStatus]] = None
+    ) -> bool:
+        if job_id != self.job.id or (from_statuses is not None and self.job.status not in from_statuses):
+            return False
+        self.job.status = status
+        if status == BroadcastStatus.RUNNING:
+            self.job.started_at = self.job.started_at or datetime.utcnow()
+        else:
+            self.job.finished_at = datetime.utcnow()
+        return True
+
+    async def get_pending_deliveries(self, job_id: int) -> array:
+        return array('q', sorted(
+            chat_id for chat_id, (status, _, _) in self.deliveries.items() if status == DeliveryStatus.PENDING
+        ))
+
+    async def save_delivery_results(
+        self,
+        job_id: int,
+        results: list[tuple[int, DeliveryStatus, Optional[str], Optional[list[int]]]]
+    ) -> None:
+        if not results:
+            return
+        self.checkpoints += 1
+        for chat_id, status, error, message_ids in results:
+            self.deliveries[chat_id] = (status, error, message_ids)
+            self.saved[chat_id] += 1
+            if status == DeliveryStatus.SENT:
+                self.job.sent += 1
+            else:
+                self.job.failed += 1
+
+    async def mark_users_unreachable(self, telegram_ids: list[int]) -> int:
+        self.users_unreachable.update(telegram_ids)
+        return len(telegram_ids)
+
+    async def deactivate_groups(self, chat_ids: list[int]) -> int:
+        self.groups_deactivated.update(chat_ids)
+        return len(chat_ids)
+
+    async def migrate_group(self, old_chat_id: int, new_chat_id: int) -> bool:
+        return False
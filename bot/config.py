@@ -13,4 +13,41 @@ POSTGRES_DB = os.getenv("POSTGRES_DB", "telegram_bot")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "postgres")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
-DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+# Connection pool; size it from the slow checkout warnings in the log
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # Extra connections opened under bursts
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")  # Drop connections killed by a Postgres restart
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reconnect after this many seconds, -1 = never
+DB_SLOW_CHECKOUT = float(os.getenv("DB_SLOW_CHECKOUT", "0.1"))  # Log checkouts that waited longer, seconds
+# asyncpg tuning
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100"))  # Per connection, 0 = off
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # 0 = no limit
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "kiberjon_bot")  # Shown in pg_stat_activity
+
+DATABASE_URL = (
+    f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    f"?prepared_statement_cache_size={DB_PREPARED_STATEMENT_CACHE_SIZE}"
+)
+
+# Local time of admins (Tashkent, UTC+5) for scheduled broadcasts
+TIMEZONE_OFFSET_HOURS = int(os.getenv("TIMEZONE_OFFSET_HOURS", "5"))
+
+# In-process user cache; rows older than the TTL are reloaded
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))  # 0 disables the cache
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # Seconds
+
+# Admin ids are cached for authorization and reloaded after this many seconds
+ADMIN_IDS_MAX_AGE = float(os.getenv("ADMIN_IDS_MAX_AGE", "60"))
+
+# Country code assumed for phone numbers entered without one
+PHONE_COUNTRY_CODE = os.getenv("PHONE_COUNTRY_CODE", "998")
+
+# Broadcast settings
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "20"))
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "28"))  # Telegram allows ~30 msg/s
+BROADCAST_PRIVATE_INTERVAL = float(os.getenv("BROADCAST_PRIVATE_INTERVAL", "1.0"))  # 1 msg/s per chat
+BROADCAST_GROUP_INTERVAL = float(os.getenv("BROADCAST_GROUP_INTERVAL", "3.0"))  # 20 msg/min per group
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))  # Network/server errors
+# Rate and interval limits above apply to every outgoing message, not only broadcasts
+OUTBOUND_CHAT_BURST = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))  # Back-to-back messages per private chat before spacing
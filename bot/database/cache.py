@@ -0,0 +1,97 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+from bot.database.models import User
+
+
+class UserCache:
+    """Bounded LRU cache of detached User rows with a time-to-live.
+
+    Rows are stored once by primary key; telegram_id and referral_code
+    are secondary indexes into the same entries. Database refreshes or
+    invalidates entries on every write that goes through it, the TTL
+    bounds staleness from writes made elsewhere.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        # id -> (expires_at, user), least recently used first
+        self._entries: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        self._by_telegram_id: dict[int, int] = {}
+        self._by_referral_code: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, user_id: Optional[int]) -> Optional[User]:
+        entry = self._entries.get(user_id) if user_id is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(user_id)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        return self._get(user_id)
+
+    def get_by_telegram_id(self, telegram_id: int) -> Optional[User]:
+        return self._get(self._by_telegram_id.get(telegram_id))
+
+    def get_by_referral_code(self, referral_code: str) -> Optional[User]:
+        return self._get(self._by_referral_code.get(referral_code))
+
+    def put(self, user: Optional[User]) -> None:
+        """Store (or replace) a user loaded from the database"""
+        if user is None or self.max_size <= 0:
+            return
+        self._remove(user.id)
+        self._entries[user.id] = (time.monotonic() + self.ttl, user)
+        self._by_telegram_id[user.telegram_id] = user.id
+        if user.referral_code:
+            self._by_referral_code[user.referral_code] = user.id
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        user = entry[1]
+        if self._by_telegram_id.get(user.telegram_id) == user_id:
+            del self._by_telegram_id[user.telegram_id]
+        if user.referral_code and self._by_referral_code.get(user.referral_code) == user_id:
+            del self._by_referral_code[user.referral_code]
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            self._remove(user_id)
+
+    def invalidate_telegram_ids(self, telegram_ids: Iterable[int]) -> None:
+        for telegram_id in telegram_ids:
+            user_id = self._by_telegram_id.get(telegram_id)
+            if user_id is not None:
+                self._remove(user_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_telegram_id.clear()
+        self._by_referral_code.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
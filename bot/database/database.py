@@ -1,39 +1,207 @@
-from typing import Optional
+from typing import Optional, Iterable, AsyncIterator
+from dataclasses import dataclass
 from datetime import datetime
+from array import array
+import logging
 import secrets
 import string
+import time
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import select
-from bot.database.models import Base, User, UserRole, Group, ChatType, CoinTransaction, TransactionType
-from bot.config import DATABASE_URL
+from sqlalchemy import (
+    select, insert, update, text, func, true, tuple_, any_, bindparam, literal, or_, String, Integer
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from bot.database.models import (
+    Base, User, UserRole, Group, ChatType, CoinTransaction, TransactionType,
+    BroadcastJob, BroadcastDelivery, BroadcastTarget, BroadcastStatus, DeliveryStatus
+)
+from bot.database.segments import Segment
+from bot.database.cache import UserCache
+from bot.config import (
+    DATABASE_URL, PHONE_COUNTRY_CODE,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_SLOW_CHECKOUT,
+    DB_STATEMENT_TIMEOUT_MS, DB_APPLICATION_NAME, USER_CACHE_SIZE, USER_CACHE_TTL
+)
+
+logger = logging.getLogger(__name__)
+
+
+# create_all() doesn't alter existing tables, so columns and indexes added
+# after the first release are applied here (idempotent, PostgreSQL)
+SCHEMA_UPGRADES = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_reachable BOOLEAN NOT NULL DEFAULT TRUE",
+    "CREATE INDEX IF NOT EXISTS ix_users_is_reachable ON users (is_reachable)",
+    "CREATE INDEX IF NOT EXISTS ix_users_language_code ON users (language_code)",
+    "CREATE INDEX IF NOT EXISTS ix_users_coins ON users (coins)",
+    "CREATE INDEX IF NOT EXISTS ix_users_created_at ON users (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_users_referred_by_id ON users (referred_by_id)",
+    "CREATE INDEX IF NOT EXISTS ix_groups_chat_type ON groups (chat_type)",
+    "CREATE INDEX IF NOT EXISTS ix_groups_is_active ON groups (is_active)",
+    "CREATE INDEX IF NOT EXISTS ix_coin_transactions_created_at_id ON coin_transactions (created_at, id)",
+    # Backfill only in the run that adds the columns; afterwards the write path sets them
+    "DO $$ BEGIN "
+    "IF NOT EXISTS (SELECT 1 FROM information_schema.columns "
+    "WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'phone_digits') THEN "
+    "ALTER TABLE users ADD COLUMN phone_digits VARCHAR(20), ADD COLUMN phone_digits_rev VARCHAR(20); "
+    "UPDATE users SET phone_digits = regexp_replace(phone_number, '\\D', '', 'g'), "
+    "phone_digits_rev = reverse(regexp_replace(phone_number, '\\D', '', 'g')) "
+    "WHERE phone_number IS NOT NULL; "
+    "END IF; "
+    "END $$",
+    "CREATE INDEX IF NOT EXISTS ix_users_phone_digits ON users (phone_digits)",
+    "CREATE INDEX IF NOT EXISTS ix_users_phone_digits_rev ON users (phone_digits_rev text_pattern_ops)",
+]
+
+# Shortest digit string used for partial (suffix) phone matches
+PHONE_SUFFIX_MIN_DIGITS = 7
+
+
+def normalize_phone(phone_number: str) -> str:
+    """Phone number as digits only (E.164 without '+')"""
+    return ''.join(filter(str.isdigit, phone_number))
+
+
+def phone_candidates(phone_number: str) -> list[tuple[bool, str]]:
+    """Match rules for an entered number, best match first.
+
+    (False, digits): stored phone_digits equal digits.
+    (True, digits): stored phone_digits end with digits.
+    """
+    clean_phone = normalize_phone(phone_number)
+    if not clean_phone:
+        return []
+    candidates = [(False, clean_phone)]
+    if len(clean_phone) >= PHONE_SUFFIX_MIN_DIGITS:
+        # Entered without country code
+        if not clean_phone.startswith(PHONE_COUNTRY_CODE):
+            candidates.append((False, PHONE_COUNTRY_CODE + clean_phone))
+        # Entered without any (other) prefix: stored number ends with it
+        candidates.append((True, clean_phone))
+        # Stored without country code: entered number ends with it
+        candidates.extend(
+            (False, clean_phone[i:]) for i in range(1, len(clean_phone) - PHONE_SUFFIX_MIN_DIGITS + 1)
+        )
+    return candidates
+
+
+# Admin list filters, pushed into SQL by the page/count queries
+USER_LIST_FILTERS = {
+    "all": (),
+    "reg": (User.is_registered == True,),
+    "adm": (User.role == UserRole.ADMIN,),
+    "coin": (User.coins > 0,),
+}
+GROUP_LIST_FILTERS = {
+    "all": (),
+    "act": (Group.is_active == True,),
+    "grp": (Group.chat_type == ChatType.GROUP,),
+    "sgrp": (Group.chat_type == ChatType.SUPERGROUP,),
+    "chan": (Group.chat_type == ChatType.CHANNEL,),
+}
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool that measures how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connect(self):
+        started = time.monotonic()
+        try:
+            return super().connect()
+        finally:
+            waited = time.monotonic() - started
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if waited >= DB_SLOW_CHECKOUT:
+                logger.warning(f"Waited {waited * 1000:.0f} ms for a database connection ({self.status()})")
+
+
+@dataclass
+class RegistrationResult:
+    """Outcome of Database.complete_registration"""
+    user: User
+    referrer: Optional[User] = None  # Set if the referral bonus was granted
+    referrer_balance: Optional[int] = None
 
 
 class Database:
     def __init__(self):
-        self.engine = create_async_engine(DATABASE_URL, echo=False)
+        server_settings = {"application_name": DB_APPLICATION_NAME}
+        if DB_STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        self.engine = create_async_engine(
+            DATABASE_URL,
+            echo=False,
+            poolclass=TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            pool_recycle=DB_POOL_RECYCLE,
+            connect_args={"server_settings": server_settings}
+        )
         self.session_maker = async_sessionmaker(
             self.engine,
             class_=AsyncSession,
             expire_on_commit=False
         )
+        # (computed_at, counters) of the last get_statistics() call
+        self._statistics: Optional[tuple[float, dict[str, int]]] = None
+        # Users by telegram_id / id / referral_code; every user write below refreshes it
+        self.user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+        # (loaded_at, telegram ids) of admins, see get_admin_ids()
+        self._admin_ids: Optional[tuple[float, frozenset[int]]] = None
+        # chat_id -> (title, is_active) of every group in the table, see load_known_groups()
+        self.known_groups: dict[int, tuple[Optional[str], bool]] = {}
+
+    def get_pool_stats(self) -> dict:
+        """Connection pool usage and checkout wait times"""
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": pool.checkouts,
+            "avg_wait": pool.total_wait / pool.checkouts if pool.checkouts else 0.0,
+            "max_wait": pool.max_wait,
+        }
 
     async def create_tables(self):
         """Create all tables in the database"""
         async with self.engine.begin() as conn:
+            # Index builds and the phone backfill may outlast DB_STATEMENT_TIMEOUT_MS
+            await conn.execute(text("SET LOCAL statement_timeout = 0"))
             await conn.run_sync(Base.metadata.create_all)
+            for statement in SCHEMA_UPGRADES:
+                await conn.execute(text(statement))
 
     async def drop_tables(self):
         """Drop all tables in the database"""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
+        self.user_cache.clear()
+        self.known_groups.clear()
 
     async def get_user(self, telegram_id: int) -> Optional[User]:
         """Get user by telegram_id"""
+        user = self.user_cache.get_by_telegram_id(telegram_id)
+        if user:
+            return user
         async with self.session_maker() as session:
             result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
-            return result.scalar_one_or_none()
+            user = result.scalar_one_or_none()
+            self.user_cache.put(user)
+            return user
 
     async def create_user(
         self,
@@ -44,22 +212,102 @@ class Database:
         language_code: Optional[str] = None,
         role: UserRole = UserRole.USER
     ) -> User:
-        """Create a new user"""
+        """Create a new user; returns the existing one if /start raced it"""
         async with self.session_maker() as session:
-            user = User(
-                telegram_id=telegram_id,
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-                language_code=language_code,
-                role=role,
-                is_registered=False
+            await session.execute(
+                pg_insert(User)
+                .values(
+                    telegram_id=telegram_id,
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    language_code=language_code,
+                    role=role,
+                    is_registered=False
+                )
+                .on_conflict_do_nothing(index_elements=[User.telegram_id])
+            )
+            result = await session.execute(
+                select(User).where(User.telegram_id == telegram_id)
             )
-            session.add(user)
+            user = result.scalar_one()
             await session.commit()
-            await session.refresh(user)
+            self.user_cache.put(user)
             return user
 
+    async def complete_registration(
+        self,
+        telegram_id: int,
+        preferred_name: str,
+        referral_code: Optional[str] = None,
+        referral_bonus: int = 7,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        language_code: Optional[str] = None
+    ) -> RegistrationResult:
+        """Finish registration in one transaction.
+
+        Upserts the user as registered, assigns a referral code, links the
+        referrer and grants the referral bonus - all in the same commit.
+        """
+        async with self.session_maker() as session:
+            # Upsert also locks the row, so concurrent calls can't double the bonus
+            result = await session.scalars(
+                pg_insert(User)
+                .values(
+                    telegram_id=telegram_id,
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    language_code=language_code,
+                    preferred_name=preferred_name,
+                    is_registered=True
+                )
+                .on_conflict_do_update(
+                    index_elements=[User.telegram_id],
+                    set_={"preferred_name": preferred_name, "is_registered": True, "updated_at": datetime.utcnow()}
+                )
+                .returning(User),
+                execution_options={"populate_existing": True}
+            )
+            user = result.one()
+
+            if not user.referral_code:
+                await self._assign_referral_code(session, user)
+
+            registration = RegistrationResult(user=user)
+            if referral_code and user.referred_by_id is None:
+                result = await session.execute(
+                    select(User).where(User.referral_code == referral_code)
+                )
+                referrer = result.scalar_one_or_none()
+                if referrer and referrer.id != user.id:
+                    user.referred_by_id = referrer.id
+                    result = await session.execute(
+                        update(User)
+                        .where(User.id == referrer.id)
+                        .values(coins=User.coins + referral_bonus)
+                        .returning(User.coins)
+                        .execution_options(synchronize_session=False)
+                    )
+                    registration.referrer = referrer
+                    registration.referrer_balance = result.scalar_one()
+                    session.add(CoinTransaction(
+                        user_id=referrer.id,
+                        amount=referral_bonus,
+                        transaction_type=TransactionType.REFERRAL_BONUS,
+                        description=f"Referal bonus: {preferred_name} botga qo'shildi",
+                        related_user_id=user.id
+                    ))
+
+            await session.commit()
+            self.user_cache.put(user)
+            if registration.referrer:
+                # Cached referrer has the old balance
+                self.user_cache.invalidate([registration.referrer.id])
+            return registration
+
     async def update_user_phone(self, telegram_id: int, phone_number: str) -> User:
         """Update user's phone number"""
         async with self.session_maker() as session:
@@ -69,8 +317,11 @@ class Database:
             user = result.scalar_one_or_none()
             if user:
                 user.phone_number = phone_number
+                user.phone_digits = normalize_phone(phone_number)
+                user.phone_digits_rev = user.phone_digits[::-1]
                 await session.commit()
                 await session.refresh(user)
+            self.user_cache.put(user)
             return user
 
     async def update_user_name(self, telegram_id: int, preferred_name: str) -> User:
@@ -85,6 +336,7 @@ class Database:
                 user.is_registered = True
                 await session.commit()
                 await session.refresh(user)
+            self.user_cache.put(user)
             return user
 
     async def update_user_role(self, telegram_id: int, role: UserRole) -> User:
@@ -98,8 +350,28 @@ class Database:
                 user.role = role
                 await session.commit()
                 await session.refresh(user)
+            self.user_cache.put(user)
+            if user and self._admin_ids:
+                loaded_at, admin_ids = self._admin_ids
+                if role == UserRole.ADMIN:
+                    admin_ids = admin_ids | {telegram_id}
+                else:
+                    admin_ids = admin_ids - {telegram_id}
+                self._admin_ids = (loaded_at, admin_ids)
             return user
 
+    async def get_admin_ids(self, max_age: float = 60.0) -> frozenset[int]:
+        """Telegram ids of admins, reloaded every max_age seconds"""
+        if self._admin_ids and time.monotonic() - self._admin_ids[0] < max_age:
+            return self._admin_ids[1]
+        async with self.session_maker() as session:
+            result = await session.execute(
+                select(User.telegram_id).where(User.role == UserRole.ADMIN)
+            )
+            admin_ids = frozenset(result.scalars())
+        self._admin_ids = (time.monotonic(), admin_ids)
+        return admin_ids
+
     async def get_all_users(self, role: Optional[UserRole] = None) -> list[User]:
         """Get all users, optionally filtered by role"""
         async with self.session_maker() as session:
@@ -109,14 +381,203 @@ class Database:
             result = await session.execute(query)
             return list(result.scalars().all())
 
+    async def get_statistics(self, max_age: float = 10.0) -> dict[str, int]:
+        """Get admin panel counters in one query, cached for max_age seconds"""
+        if self._statistics and time.monotonic() - self._statistics[0] < max_age:
+            return self._statistics[1]
+
+        users = select(
+            func.count().label("users_total"),
+            func.count().filter(User.is_registered == True).label("users_registered"),
+            func.count().filter(User.role == UserRole.ADMIN).label("users_admins"),
+            func.count().filter(User.role == UserRole.USER).label("users_regular")
+        ).select_from(User).subquery()
+        active = Group.is_active == True
+        groups = select(
+            func.count().label("groups_total"),
+            func.count().filter(active).label("groups_active"),
+            func.count().filter(Group.chat_type == ChatType.CHANNEL).label("channels"),
+            func.count().filter(Group.chat_type == ChatType.SUPERGROUP).label("supergroups"),
+            func.count().filter(Group.chat_type == ChatType.GROUP).label("groups"),
+            func.count().filter(active, Group.bot_is_admin == True).label("bot_admin"),
+            func.count().filter(active, Group.bot_is_admin == False).label("bot_member")
+        ).select_from(Group).subquery()
+
+        async with self.session_maker() as session:
+            # Both single-row aggregates in one round trip
+            result = await session.execute(select(users, groups).select_from(users.join(groups, true())))
+            statistics = dict(result.mappings().one())
+        self._statistics = (time.monotonic(), statistics)
+        return statistics
+
+    async def _get_page(
+        self,
+        model,
+        filters: Iterable,
+        after_id: Optional[int],
+        before_id: Optional[int],
+        limit: int
+    ) -> list:
+        """Keyset page ordered by id: rows after after_id, or the ones right before before_id"""
+        query = select(model).where(*filters)
+        if before_id is not None:
+            query = query.where(model.id < before_id).order_by(model.id.desc())
+        else:
+            if after_id is not None:
+                query = query.where(model.id > after_id)
+            query = query.order_by(model.id)
+        async with self.session_maker() as session:
+            result = await session.execute(query.limit(limit))
+            rows = list(result.scalars().all())
+        if before_id is not None:
+            rows.reverse()
+        return rows
+
+    async def _count(self, model, filters: Iterable) -> int:
+        async with self.session_maker() as session:
+            result = await session.execute(select(func.count()).select_from(model).where(*filters))
+            return result.scalar() or 0
+
+    async def get_users_page(
+        self,
+        list_filter: str = "all",
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 10
+    ) -> list[User]:
+        """Get one page of users for the admin list"""
+        return await self._get_page(User, USER_LIST_FILTERS[list_filter], after_id, before_id, limit)
+
+    async def count_users(self, list_filter: str = "all") -> int:
+        """Count users matching an admin list filter"""
+        return await self._count(User, USER_LIST_FILTERS[list_filter])
+
+    async def set_user_reachable(self, telegram_id: int, is_reachable: bool) -> None:
+        """Update whether the bot can message the user (blocked/unblocked)"""
+        async with self.session_maker() as session:
+            await session.execute(
+                update(User)
+                .where(User.telegram_id == telegram_id)
+                .values(is_reachable=is_reachable)
+            )
+            await session.commit()
+        self.user_cache.invalidate_telegram_ids([telegram_id])
+
+    async def mark_users_unreachable(self, telegram_ids: list[int]) -> int:
+        """Mark many users as unreachable with a single UPDATE"""
+        if not telegram_ids:
+            return 0
+        async with self.session_maker() as session:
+            result = await session.execute(
+                update(User)
+                .where(User.telegram_id.in_(telegram_ids), User.is_reachable == True)
+                .values(is_reachable=False)
+            )
+            await session.commit()
+        self.user_cache.invalidate_telegram_ids(telegram_ids)
+        return result.rowcount
+
+    def _user_recipient_filters(
+        self,
+        segment: Optional[Segment] = None,
+        include_unreachable: bool = False
+    ) -> list:
+        """SQL predicates selecting broadcast recipients among users"""
+        filters = [User.is_registered == True]
+        if not include_unreachable:
+            filters.append(User.is_reachable == True)
+        if segment:
+            if segment.language_code is not None:
+                filters.append(User.language_code == segment.language_code)
+            if segment.min_coins is not None:
+                filters.append(User.coins >= segment.min_coins)
+            if segment.max_coins is not None:
+                filters.append(User.coins <= segment.max_coins)
+            if segment.registered_from is not None:
+                filters.append(User.created_at >= segment.registered_from)
+            if segment.registered_to is not None:
+                filters.append(User.created_at < segment.registered_to)
+            if segment.referred_by_id is not None:
+                filters.append(User.referred_by_id == segment.referred_by_id)
+        return filters
+
+    def _group_recipient_filters(self, segment: Optional[Segment] = None, active_only: bool = True) -> list:
+        """SQL predicates selecting broadcast recipients among groups"""
+        filters = []
+        if active_only:
+            filters.append(Group.is_active == True)
+        if segment:
+            if segment.chat_type is not None:
+                filters.append(Group.chat_type == segment.chat_type)
+            if segment.bot_is_admin is not None:
+                filters.append(Group.bot_is_admin == segment.bot_is_admin)
+        return filters
+
+    async def count_recipients(self, target: BroadcastTarget, segment: Optional[Segment] = None) -> int:
+        """Cheap COUNT preview of a broadcast audience"""
+        async with self.session_maker() as session:
+            if target == BroadcastTarget.USERS:
+                query = select(func.count(User.id)).where(*self._user_recipient_filters(segment))
+            else:
+                query = select(func.count(Group.id)).where(*self._group_recipient_filters(segment))
+            result = await session.execute(query)
+            return result.scalar() or 0
+
+    async def iter_user_chat_ids(
+        self,
+        batch_size: int = 10000,
+        include_unreachable: bool = False,
+        segment: Optional[Segment] = None
+    ) -> AsyncIterator[array]:
+        """Stream telegram_id of registered users in keyset batches of array('q')"""
+        filters = self._user_recipient_filters(segment, include_unreachable)
+        last_id = 0
+        while True:
+            async with self.session_maker() as session:
+                query = select(User.id, User.telegram_id).where(*filters, User.id > last_id)
+                result = await session.execute(
+                    query.order_by(User.id).limit(batch_size)
+                )
+                rows = result.all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield array('q', (row.telegram_id for row in rows))
+
+    async def get_user_chat_ids(
+        self,
+        include_unreachable: bool = False,
+        segment: Optional[Segment] = None
+    ) -> array:
+        """Get telegram_id of all registered users as a compact array('q')"""
+        chat_ids = array('q')
+        async for batch in self.iter_user_chat_ids(include_unreachable=include_unreachable, segment=segment):
+            chat_ids.extend(batch)
+        return chat_ids
+
     # Group operations
+    def _remember_group(self, group: Optional[Group]) -> None:
+        if group:
+            self.known_groups[group.chat_id] = (group.title, group.is_active)
+
+    async def load_known_groups(self) -> int:
+        """Fill known_groups from the table; the group methods below keep it current"""
+        async with self.session_maker() as session:
+            result = await session.execute(
+                select(Group.chat_id, Group.title, Group.is_active)
+            )
+            self.known_groups = {chat_id: (title, is_active) for chat_id, title, is_active in result}
+        return len(self.known_groups)
+
     async def get_group(self, chat_id: int) -> Optional[Group]:
         """Get group by chat_id"""
         async with self.session_maker() as session:
             result = await session.execute(
                 select(Group).where(Group.chat_id == chat_id)
             )
-            return result.scalar_one_or_none()
+            group = result.scalar_one_or_none()
+            self._remember_group(group)
+            return group
 
     async def create_group(
         self,
@@ -145,6 +606,7 @@ class Database:
             session.add(group)
             await session.commit()
             await session.refresh(group)
+            self._remember_group(group)
             return group
 
     async def update_group(
@@ -178,6 +640,7 @@ class Database:
                     group.member_count = member_count
                 await session.commit()
                 await session.refresh(group)
+            self._remember_group(group)
             return group
 
     async def deactivate_group(self, chat_id: int) -> Optional[Group]:
@@ -192,8 +655,56 @@ class Database:
                 group.left_at = datetime.utcnow()
                 await session.commit()
                 await session.refresh(group)
+            self._remember_group(group)
             return group
 
+    async def deactivate_groups(self, chat_ids: list[int]) -> int:
+        """Mark many groups as inactive with a single UPDATE"""
+        if not chat_ids:
+            return 0
+        async with self.session_maker() as session:
+            result = await session.execute(
+                update(Group)
+                .where(Group.chat_id.in_(chat_ids), Group.is_active == True)
+                .values(is_active=False, left_at=datetime.utcnow())
+            )
+            await session.commit()
+        for chat_id in chat_ids:
+            if chat_id in self.known_groups:
+                self.known_groups[chat_id] = (self.known_groups[chat_id][0], False)
+        return result.rowcount
+
+    async def migrate_group(self, old_chat_id: int, new_chat_id: int) -> bool:
+        """Move a group upgraded to a supergroup to its new chat_id, deliveries included.
+
+        Returns False if the new chat is already stored as a separate group.
+        """
+        async with self.session_maker() as session:
+            result = await session.execute(
+                select(Group.id).where(Group.chat_id == new_chat_id)
+            )
+            if result.first():
+                return False
+            result = await session.execute(
+                update(Group)
+                .where(Group.chat_id == old_chat_id)
+                .values(chat_id=new_chat_id, chat_type=ChatType.SUPERGROUP)
+                .returning(Group.title, Group.is_active)
+            )
+            group = result.first()
+            if not group:
+                return False
+            # Copies of earlier broadcasts now live in the supergroup
+            await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.chat_id == old_chat_id)
+                .values(chat_id=new_chat_id)
+            )
+            await session.commit()
+        self.known_groups.pop(old_chat_id, None)
+        self.known_groups[new_chat_id] = (group.title, group.is_active)
+        return True
+
     async def reactivate_group(self, chat_id: int) -> Optional[Group]:
         """Reactivate group (bot rejoined)"""
         async with self.session_maker() as session:
@@ -206,6 +717,7 @@ class Database:
                 group.left_at = None
                 await session.commit()
                 await session.refresh(group)
+            self._remember_group(group)
             return group
 
     async def get_all_groups(self, active_only: bool = False) -> list[Group]:
@@ -217,6 +729,30 @@ class Database:
             result = await session.execute(query)
             return list(result.scalars().all())
 
+    async def get_groups_page(
+        self,
+        list_filter: str = "all",
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 10
+    ) -> list[Group]:
+        """Get one page of groups for the admin list"""
+        return await self._get_page(Group, GROUP_LIST_FILTERS[list_filter], after_id, before_id, limit)
+
+    async def count_groups(self, list_filter: str = "all") -> int:
+        """Count groups matching an admin list filter"""
+        return await self._count(Group, GROUP_LIST_FILTERS[list_filter])
+
+    async def get_group_chat_ids(self, active_only: bool = True, segment: Optional[Segment] = None) -> array:
+        """Get chat_id of groups as a compact array('q')"""
+        async with self.session_maker() as session:
+            query = select(Group.chat_id).where(*self._group_recipient_filters(segment, active_only))
+            result = await session.stream_scalars(query.execution_options(yield_per=10000))
+            chat_ids = array('q')
+            async for chat_id in result:
+                chat_ids.append(chat_id)
+            return chat_ids
+
     async def close(self):
         """Close database connection"""
         await self.engine.dispose()
@@ -229,47 +765,86 @@ class Database:
 
     async def get_user_by_referral_code(self, referral_code: str) -> Optional[User]:
         """Get user by referral code"""
+        user = self.user_cache.get_by_referral_code(referral_code)
+        if user:
+            return user
         async with self.session_maker() as session:
             result = await session.execute(
                 select(User).where(User.referral_code == referral_code)
             )
-            return result.scalar_one_or_none()
+            user = result.scalar_one_or_none()
+            self.user_cache.put(user)
+            return user
 
     async def get_user_by_phone(self, phone_number: str) -> Optional[User]:
         """Get user by phone number - handles different formats"""
-        async with self.session_maker() as session:
-            # Clean phone number - remove spaces, dashes, parentheses
-            clean_phone = ''.join(filter(str.isdigit, phone_number))
-            
-            # Try exact match first
-            result = await session.execute(
-                select(User).where(User.phone_number == phone_number)
+        found, _ = await self.get_users_by_phones([phone_number])
+        return found[0][1] if found else None
+
+    async def get_users_by_phones(self, phone_numbers: list[str]) -> tuple[list[tuple[str, User]], list[str]]:
+        """Resolve many phone numbers with one indexed query.
+
+        Exact digits go through = ANY on phone_digits, "stored number ends with
+        the entered one" through prefix LIKEs on phone_digits_rev. Returns
+        (entered phone, user) pairs and not found phones, both in input order.
+        """
+        candidates = {phone: phone_candidates(phone) for phone in phone_numbers}
+        exact = sorted({digits for values in candidates.values() for is_suffix, digits in values if not is_suffix})
+        endings = sorted({digits for values in candidates.values() for is_suffix, digits in values if is_suffix})
+
+        users_by_digits: dict[str, User] = {}
+        users_by_ending: dict[str, User] = {}
+        if exact:
+            conditions = [User.phone_digits == any_(bindparam("phones", exact, type_=ARRAY(String)))]
+            # Digits only, so the patterns are inlined: the planner needs constant
+            # prefixes to use the text_pattern_ops index
+            conditions.extend(
+                User.phone_digits_rev.like(literal(f"{digits[::-1]}%", literal_execute=True))
+                for digits in endings
             )
-            user = result.scalar_one_or_none()
-            
-            if user:
-                return user
-            
-            # Try with + prefix
-            if not phone_number.startswith('+'):
+            wanted_endings = set(endings)
+            async with self.session_maker() as session:
                 result = await session.execute(
-                    select(User).where(User.phone_number == f"+{phone_number}")
+                    select(User).where(or_(*conditions)).order_by(User.id)
                 )
-                user = result.scalar_one_or_none()
+                for user in result.scalars():
+                    # Lowest id wins
+                    users_by_digits.setdefault(user.phone_digits, user)
+                    for i in range(len(user.phone_digits) - PHONE_SUFFIX_MIN_DIGITS + 1):
+                        if user.phone_digits[i:] in wanted_endings:
+                            users_by_ending.setdefault(user.phone_digits[i:], user)
+
+        def match(phone: str) -> Optional[User]:
+            for is_suffix, digits in candidates[phone]:
+                user = (users_by_ending if is_suffix else users_by_digits).get(digits)
                 if user:
                     return user
-            
-            # Try to find by matching digits only
-            if clean_phone:
-                result = await session.execute(select(User))
-                for db_user in result.scalars():
-                    if db_user.phone_number:
-                        db_clean = ''.join(filter(str.isdigit, db_user.phone_number))
-                        if db_clean == clean_phone or db_clean.endswith(clean_phone) or clean_phone.endswith(db_clean):
-                            return db_user
-            
             return None
 
+        found = []
+        not_found = []
+        for phone in phone_numbers:
+            user = match(phone)
+            if user:
+                found.append((phone, user))
+            else:
+                not_found.append(phone)
+        return found, not_found
+
+    async def _assign_referral_code(self, session: AsyncSession, user: User) -> str:
+        """Set a unique referral code; the unique index detects collisions"""
+        while True:
+            code = self.generate_referral_code()
+            try:
+                async with session.begin_nested():
+                    user.referral_code = code
+            except IntegrityError:
+                # Taken - only the savepoint is rolled back, but that expires
+                # the user; reload it eagerly (no lazy loads on AsyncSession)
+                await session.refresh(user)
+                continue
+            return code
+
     async def set_referral_code(self, user_id: int) -> str:
         """Generate and set referral code for user"""
         async with self.session_maker() as session:
@@ -278,51 +853,60 @@ class Database:
             )
             user = result.scalar_one_or_none()
             if user and not user.referral_code:
-                # Generate unique code
-                while True:
-                    code = self.generate_referral_code()
-                    existing = await self.get_user_by_referral_code(code)
-                    if not existing:
-                        break
-                
-                user.referral_code = code
+                code = await self._assign_referral_code(session, user)
                 await session.commit()
-                await session.refresh(user)
+                self.user_cache.put(user)
                 return code
             return user.referral_code if user else None
 
-    async def add_coins(
+    async def _change_coins(
         self,
         user_id: int,
-        amount: int,
+        delta: int,
         transaction_type: TransactionType,
         description: Optional[str] = None,
         admin_id: Optional[int] = None,
         related_user_id: Optional[int] = None
-    ) -> bool:
-        """Add coins to user and record transaction"""
+    ) -> Optional[int]:
+        """Atomically change balance (never below 0) and record transaction; returns new balance"""
         async with self.session_maker() as session:
             result = await session.execute(
-                select(User).where(User.id == user_id)
+                update(User)
+                .where(User.id == user_id)
+                .values(coins=func.greatest(User.coins + delta, 0))
+                .returning(User.coins)
+                .execution_options(synchronize_session=False)
             )
-            user = result.scalar_one_or_none()
-            if user:
-                user.coins += amount
-                
-                # Create transaction record
-                transaction = CoinTransaction(
-                    user_id=user_id,
-                    amount=amount,
-                    transaction_type=transaction_type,
-                    description=description,
-                    admin_id=admin_id,
-                    related_user_id=related_user_id
-                )
-                session.add(transaction)
-                
-                await session.commit()
-                return True
-            return False
+            coins = result.scalar_one_or_none()
+            if coins is None:
+                return None
+            
+            # Create transaction record
+            session.add(CoinTransaction(
+                user_id=user_id,
+                amount=delta,
+                transaction_type=transaction_type,
+                description=description,
+                admin_id=admin_id,
+                related_user_id=related_user_id
+            ))
+            await session.commit()
+        self.user_cache.invalidate([user_id])
+        return coins
+
+    async def add_coins(
+        self,
+        user_id: int,
+        amount: int,
+        transaction_type: TransactionType,
+        description: Optional[str] = None,
+        admin_id: Optional[int] = None,
+        related_user_id: Optional[int] = None
+    ) -> Optional[int]:
+        """Add coins to user and record transaction; returns new balance or None if no such user"""
+        return await self._change_coins(
+            user_id, amount, transaction_type, description, admin_id, related_user_id
+        )
 
     async def remove_coins(
         self,
@@ -330,31 +914,73 @@ class Database:
         amount: int,
         description: Optional[str] = None,
         admin_id: Optional[int] = None
-    ) -> bool:
-        """Remove coins from user and record transaction"""
+    ) -> Optional[int]:
+        """Remove coins from user and record transaction; returns new balance or None if no such user"""
+        return await self._change_coins(
+            user_id, -amount, TransactionType.ADMIN_REMOVE, description, admin_id
+        )
+
+    async def _change_coins_bulk(
+        self,
+        user_ids: Iterable[int],
+        delta: int,
+        transaction_type: TransactionType,
+        description: Optional[str],
+        admin_id: Optional[int]
+    ) -> int:
+        """One UPDATE for all balances plus one multi-row INSERT of transactions, in one commit"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return 0
         async with self.session_maker() as session:
             result = await session.execute(
-                select(User).where(User.id == user_id)
+                update(User)
+                .where(User.id == any_(bindparam("user_ids", user_ids, type_=ARRAY(Integer))))
+                .values(coins=func.greatest(User.coins + delta, 0))
+                .returning(User.id)
+                .execution_options(synchronize_session=False)
             )
-            user = result.scalar_one_or_none()
-            if user:
-                user.coins -= amount
-                if user.coins < 0:
-                    user.coins = 0
-                
-                # Create transaction record
-                transaction = CoinTransaction(
-                    user_id=user_id,
-                    amount=-amount,
-                    transaction_type=TransactionType.ADMIN_REMOVE,
-                    description=description,
-                    admin_id=admin_id
+            updated = list(result.scalars())
+            if updated:
+                await session.execute(
+                    insert(CoinTransaction),
+                    [
+                        {
+                            "user_id": user_id,
+                            "amount": delta,
+                            "transaction_type": transaction_type,
+                            "description": description,
+                            "admin_id": admin_id
+                        }
+                        for user_id in updated
+                    ]
                 )
-                session.add(transaction)
-                
-                await session.commit()
-                return True
-            return False
+            await session.commit()
+        self.user_cache.invalidate(updated)
+        return len(updated)
+
+    async def add_coins_bulk(
+        self,
+        user_ids: Iterable[int],
+        amount: int,
+        transaction_type: TransactionType,
+        description: Optional[str] = None,
+        admin_id: Optional[int] = None
+    ) -> int:
+        """Add coins to many users atomically; returns how many users were updated"""
+        return await self._change_coins_bulk(user_ids, amount, transaction_type, description, admin_id)
+
+    async def remove_coins_bulk(
+        self,
+        user_ids: Iterable[int],
+        amount: int,
+        description: Optional[str] = None,
+        admin_id: Optional[int] = None
+    ) -> int:
+        """Remove coins from many users atomically (balances stop at 0); returns how many were updated"""
+        return await self._change_coins_bulk(
+            user_ids, -amount, TransactionType.ADMIN_REMOVE, description, admin_id
+        )
 
     async def get_transactions(
         self,
@@ -370,9 +996,330 @@ class Database:
             result = await session.execute(query)
             return list(result.scalars().all())
 
+    def _transaction_filters(
+        self,
+        transaction_type: Optional[TransactionType] = None,
+        admin_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> list:
+        filters = []
+        if transaction_type:
+            filters.append(CoinTransaction.transaction_type == transaction_type)
+        if admin_id:
+            filters.append(CoinTransaction.admin_id == admin_id)
+        if date_from:
+            filters.append(CoinTransaction.created_at >= date_from)
+        if date_to:
+            filters.append(CoinTransaction.created_at < date_to)
+        return filters
+
+    async def get_transactions_page(
+        self,
+        older_than: Optional[tuple[datetime, int]] = None,
+        newer_than: Optional[tuple[datetime, int]] = None,
+        limit: int = 10,
+        transaction_type: Optional[TransactionType] = None,
+        admin_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> list[tuple[CoinTransaction, Optional[str]]]:
+        """Get one page of transactions, newest first, with the user's display name.
+
+        Keyset cursor is (created_at, id) of the last row of the previous page
+        (older_than) or the first row of the next page (newer_than).
+        """
+        key = tuple_(CoinTransaction.created_at, CoinTransaction.id)
+        query = (
+            select(CoinTransaction, func.coalesce(User.preferred_name, User.first_name))
+            .outerjoin(User, User.id == CoinTransaction.user_id)
+            .where(*self._transaction_filters(transaction_type, admin_id, date_from, date_to))
+        )
+        if newer_than:
+            query = query.where(key > tuple_(*newer_than)).order_by(
+                CoinTransaction.created_at, CoinTransaction.id
+            )
+        else:
+            if older_than:
+                query = query.where(key < tuple_(*older_than))
+            query = query.order_by(CoinTransaction.created_at.desc(), CoinTransaction.id.desc())
+        async with self.session_maker() as session:
+            result = await session.execute(query.limit(limit))
+            rows = [(tx, name) for tx, name in result.all()]
+        if newer_than:
+            rows.reverse()
+        return rows
+
+    async def count_transactions(
+        self,
+        transaction_type: Optional[TransactionType] = None,
+        admin_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> int:
+        """Count transactions matching the admin list filters"""
+        filters = self._transaction_filters(transaction_type, admin_id, date_from, date_to)
+        return await self._count(CoinTransaction, filters)
+
     async def get_total_coins_in_system(self) -> int:
         """Get total KiberCoins in the system"""
         async with self.session_maker() as session:
             users = await session.execute(select(User))
             total = sum(user.coins for user in users.scalars().all())
             return total
+
+    # Broadcast operations
+    async def _insert_deliveries(
+        self,
+        session: AsyncSession,
+        job_id: int,
+        recipients: Iterable[int],
+        batch_size: int = 5000
+    ) -> int:
+        """Insert pending delivery rows in batches, return their count"""
+        total = 0
+        batch = []
+        for chat_id in recipients:
+            batch.append({"job_id": job_id, "chat_id": chat_id})
+            if len(batch) >= batch_size:
+                await session.execute(insert(BroadcastDelivery), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            await session.execute(insert(BroadcastDelivery), batch)
+            total += len(batch)
+        return total
+
+    async def create_broadcast_job(
+        self,
+        admin_telegram_id: int,
+        target: BroadcastTarget,
+        from_chat_id: int,
+        message_id: int,
+        recipients: Iterable[int] = (),
+        message_ids: Optional[list[int]] = None,
+        status_chat_id: Optional[int] = None,
+        status_message_id: Optional[int] = None,
+        scheduled_at: Optional[datetime] = None,
+        spread_minutes: Optional[int] = None,
+        segment: Optional[Segment] = None,
+        template: Optional[str] = None
+    ) -> BroadcastJob:
+        """Create broadcast job with a pending delivery row per recipient.
+
+        Scheduled jobs get their recipients when they fire (activate_scheduled_broadcast).
+        """
+        async with self.session_maker() as session:
+            job = BroadcastJob(
+                admin_telegram_id=admin_telegram_id,
+                target=target,
+                from_chat_id=from_chat_id,
+                message_id=message_id,
+                message_ids=message_ids,
+                status=BroadcastStatus.SCHEDULED if scheduled_at else BroadcastStatus.PENDING,
+                scheduled_at=scheduled_at,
+                spread_minutes=spread_minutes,
+                segment=segment.to_json() if segment else None,
+                template=template,
+                status_chat_id=status_chat_id,
+                status_message_id=status_message_id
+            )
+            session.add(job)
+            await session.flush()
+
+            if not scheduled_at:
+                job.total = await self._insert_deliveries(session, job.id, recipients)
+            await session.commit()
+            await session.refresh(job)
+            return job
+
+    async def get_due_broadcast_jobs(self, now: datetime) -> list[BroadcastJob]:
+        """Get scheduled jobs whose time has come"""
+        async with self.session_maker() as session:
+            result = await session.execute(
+                select(BroadcastJob)
+                .where(
+                    BroadcastJob.status == BroadcastStatus.SCHEDULED,
+                    BroadcastJob.scheduled_at <= now
+                )
+                .order_by(BroadcastJob.scheduled_at)
+            )
+            return list(result.scalars().all())
+
+    async def activate_scheduled_broadcast(self, job_id: int, recipients: Iterable[int]) -> bool:
+        """Move a scheduled job to pending together with its delivery rows.
+
+        Returns False if the job was already fired or cancelled.
+        """
+        async with self.session_maker() as session:
+            result = await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id, BroadcastJob.status == BroadcastStatus.SCHEDULED)
+                .values(status=BroadcastStatus.PENDING)
+            )
+            if result.rowcount == 0:
+                await session.rollback()
+                return False
+
+            total = await self._insert_deliveries(session, job_id, recipients)
+            await session.execute(
+                update(BroadcastJob).where(BroadcastJob.id == job_id).values(total=total)
+            )
+            await session.commit()
+            return True
+
+    async def get_broadcast_job(self, job_id: int) -> Optional[BroadcastJob]:
+        """Get broadcast job by id"""
+        async with self.session_maker() as session:
+            result = await session.execute(
+                select(BroadcastJob).where(BroadcastJob.id == job_id)
+            )
+            return result.scalar_one_or_none()
+
+    async def get_unfinished_broadcast_jobs(self) -> list[BroadcastJob]:
+        """Get jobs interrupted by a restart or not started yet"""
+        async with self.session_maker() as session:
+            result = await session.execute(
+                select(BroadcastJob)
+                .where(BroadcastJob.status.in_([BroadcastStatus.PENDING, BroadcastStatus.RUNNING]))
+                .order_by(BroadcastJob.id)
+            )
+            return list(result.scalars().all())
+
+    async def get_pending_deliveries(self, job_id: int, batch_size: int = 10000) -> array:
+        """Get chat ids that have not received the broadcast yet as array('q')"""
+        chat_ids = array('q')
+        last_chat_id = None
+        while True:
+            async with self.session_maker() as session:
+                query = select(BroadcastDelivery.chat_id).where(
+                    BroadcastDelivery.job_id == job_id,
+                    BroadcastDelivery.status == DeliveryStatus.PENDING
+                )
+                if last_chat_id is not None:
+                    query = query.where(BroadcastDelivery.chat_id > last_chat_id)
+                result = await session.execute(
+                    query.order_by(BroadcastDelivery.chat_id).limit(batch_size)
+                )
+                batch = result.scalars().all()
+            if not batch:
+                return chat_ids
+            chat_ids.extend(batch)
+            last_chat_id = batch[-1]
+
+    async def iter_pending_template_rows(
+        self,
+        job_id: int,
+        fields: Iterable[str],
+        batch_size: int = 5000
+    ) -> AsyncIterator[list[tuple[int, dict]]]:
+        """Stream (chat_id, {field: value}) of pending deliveries with only the needed User columns"""
+        fields = list(fields)
+        columns = [getattr(User, field) for field in fields]
+        last_chat_id = None
+        while True:
+            async with self.session_maker() as session:
+                query = (
+                    select(BroadcastDelivery.chat_id, *columns)
+                    .outerjoin(User, User.telegram_id == BroadcastDelivery.chat_id)
+                    .where(
+                        BroadcastDelivery.job_id == job_id,
+                        BroadcastDelivery.status == DeliveryStatus.PENDING
+                    )
+                )
+                if last_chat_id is not None:
+                    query = query.where(BroadcastDelivery.chat_id > last_chat_id)
+                result = await session.execute(
+                    query.order_by(BroadcastDelivery.chat_id).limit(batch_size)
+                )
+                batch = [(row[0], dict(zip(fields, row[1:]))) for row in result.all()]
+            if not batch:
+                return
+            yield batch
+            last_chat_id = batch[-1][0]
+
+    async def iter_delivered_messages(
+        self,
+        job_id: int,
+        batch_size: int = 5000
+    ) -> AsyncIterator[list[tuple[int, list[int]]]]:
+        """Stream (chat_id, message_ids) of delivered copies in keyset batches"""
+        last_chat_id = None
+        while True:
+            async with self.session_maker() as session:
+                query = select(BroadcastDelivery.chat_id, BroadcastDelivery.message_ids).where(
+                    BroadcastDelivery.job_id == job_id,
+                    BroadcastDelivery.status == DeliveryStatus.SENT,
+                    BroadcastDelivery.message_ids.is_not(None)
+                )
+                if last_chat_id is not None:
+                    query = query.where(BroadcastDelivery.chat_id > last_chat_id)
+                result = await session.execute(
+                    query.order_by(BroadcastDelivery.chat_id).limit(batch_size)
+                )
+                batch = [(chat_id, message_ids) for chat_id, message_ids in result.all()]
+            if not batch:
+                return
+            yield batch
+            last_chat_id = batch[-1][0]
+
+    async def set_broadcast_job_status(
+        self,
+        job_id: int,
+        status: BroadcastStatus,
+        from_statuses: Optional[Iterable[BroadcastStatus]] = None
+    ) -> bool:
+        """Update job status and its start/finish timestamps.
+
+        With from_statuses the job is updated only if it is in one of them
+        (so a concurrent cancel is not overwritten); returns whether it was.
+        """
+        values = {"status": status}
+        if status == BroadcastStatus.RUNNING:
+            values["started_at"] = func.coalesce(BroadcastJob.started_at, datetime.utcnow())
+        elif status in (BroadcastStatus.COMPLETED, BroadcastStatus.CANCELLED, BroadcastStatus.FAILED):
+            values["finished_at"] = datetime.utcnow()
+        query = update(BroadcastJob).where(BroadcastJob.id == job_id)
+        if from_statuses is not None:
+            query = query.where(BroadcastJob.status.in_(list(from_statuses)))
+        async with self.session_maker() as session:
+            result = await session.execute(
+                query.values(**values).returning(BroadcastJob.id)
+            )
+            updated = result.first() is not None
+            await session.commit()
+            return updated
+
+    async def save_delivery_results(
+        self,
+        job_id: int,
+        results: list[tuple[int, DeliveryStatus, Optional[str], Optional[list[int]]]]
+    ) -> None:
+        """Checkpoint a batch of (chat_id, status, error, message_ids) results and job counters"""
+        if not results:
+            return
+        sent = sum(1 for _, status, _, _ in results if status == DeliveryStatus.SENT)
+        failed = len(results) - sent
+        now = datetime.utcnow()
+        async with self.session_maker() as session:
+            # Bulk UPDATE by primary key
+            await session.execute(
+                update(BroadcastDelivery),
+                [
+                    {
+                        "job_id": job_id,
+                        "chat_id": chat_id,
+                        "status": status,
+                        "error": error,
+                        "message_ids": message_ids,
+                        "updated_at": now
+                    }
+                    for chat_id, status, error, message_ids in results
+                ]
+            )
+            await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id)
+                .values(sent=BroadcastJob.sent + sent, failed=BroadcastJob.failed + failed)
+            )
+            await session.commit()
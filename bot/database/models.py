@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import BigInteger, String, DateTime, Boolean, Enum, Text, Integer, ForeignKey, Numeric
+from sqlalchemy import BigInteger, String, DateTime, Boolean, Enum, Text, Integer, ForeignKey, Numeric, Index
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 import enum
 
@@ -24,12 +25,43 @@ class TransactionType(enum.Enum):
     ADMIN_REMOVE = "admin_remove"
 
 
+class BroadcastTarget(enum.Enum):
+    """Broadcast audience enum"""
+    USERS = "users"
+    GROUPS = "groups"
+
+
+class BroadcastStatus(enum.Enum):
+    """Broadcast job status enum"""
+    SCHEDULED = "scheduled"
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"  # Stopped by an unexpected error
+
+
+class DeliveryStatus(enum.Enum):
+    """Per-recipient delivery status enum"""
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
 class Base(DeclarativeBase):
     pass
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Suffix phone lookups as prefix scans (LIKE 'reversed%')
+        Index(
+            "ix_users_phone_digits_rev",
+            "phone_digits_rev",
+            postgresql_ops={"phone_digits_rev": "text_pattern_ops"}
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False, index=True)
@@ -37,17 +69,20 @@ class User(Base):
     first_name: Mapped[str] = mapped_column(String(255), nullable=True)
     last_name: Mapped[str] = mapped_column(String(255), nullable=True)
     phone_number: Mapped[str] = mapped_column(String(20), nullable=True)
+    phone_digits: Mapped[str] = mapped_column(String(20), nullable=True, index=True)  # Normalized phone, digits only
+    phone_digits_rev: Mapped[str] = mapped_column(String(20), nullable=True)  # Reversed phone_digits
     preferred_name: Mapped[str] = mapped_column(String(255), nullable=True)
-    language_code: Mapped[str] = mapped_column(String(10), nullable=True)
+    language_code: Mapped[str] = mapped_column(String(10), nullable=True, index=True)
     role: Mapped[UserRole] = mapped_column(Enum(UserRole), default=UserRole.USER, nullable=False)
     is_registered: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    is_reachable: Mapped[bool] = mapped_column(Boolean, default=True, server_default="true", nullable=False, index=True)  # False if user blocked the bot
     
     # KiberCoin fields
     referral_code: Mapped[str] = mapped_column(String(20), unique=True, nullable=True, index=True)
-    referred_by_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=True)
-    coins: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    referred_by_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    coins: Mapped[int] = mapped_column(Integer, default=0, nullable=False, index=True)
     
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     def __repr__(self):
@@ -60,12 +95,12 @@ class Group(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     chat_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False, index=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
-    chat_type: Mapped[ChatType] = mapped_column(Enum(ChatType), nullable=False)
+    chat_type: Mapped[ChatType] = mapped_column(Enum(ChatType), nullable=False, index=True)
     username: Mapped[str] = mapped_column(String(255), nullable=True)
     description: Mapped[str] = mapped_column(Text, nullable=True)
     bot_is_admin: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     bot_permissions: Mapped[str] = mapped_column(Text, nullable=True)  # JSON string
-    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False, index=True)
     member_count: Mapped[int] = mapped_column(Integer, nullable=True)
     joined_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     left_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
@@ -79,6 +114,10 @@ class Group(Base):
 class CoinTransaction(Base):
     """KiberCoin transaction history"""
     __tablename__ = "coin_transactions"
+    __table_args__ = (
+        # Keyset pagination of the admin transaction list, newest first
+        Index("ix_coin_transactions_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -91,3 +130,49 @@ class CoinTransaction(Base):
 
     def __repr__(self):
         return f"<CoinTransaction(user_id={self.user_id}, amount={self.amount}, type={self.transaction_type.value})>"
+
+
+class BroadcastJob(Base):
+    """Broadcast job - survives restarts and is resumed from pending deliveries"""
+    __tablename__ = "broadcast_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    admin_telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    target: Mapped[BroadcastTarget] = mapped_column(Enum(BroadcastTarget), nullable=False)
+    from_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    message_ids: Mapped[list[int]] = mapped_column(ARRAY(BigInteger), nullable=True)  # Album parts, sent with one copy_messages
+    status: Mapped[BroadcastStatus] = mapped_column(Enum(BroadcastStatus), default=BroadcastStatus.PENDING, nullable=False, index=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sent: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    scheduled_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)  # UTC, None = send now
+    spread_minutes: Mapped[int] = mapped_column(Integer, nullable=True)  # Spread delivery over this window
+    segment: Mapped[str] = mapped_column(Text, nullable=True)  # JSON audience filters, see segments.Segment
+    template: Mapped[str] = mapped_column(Text, nullable=True)  # Personalized HTML text, see services.templates
+    status_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=True)  # Admin's progress message
+    status_message_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<BroadcastJob(id={self.id}, target={self.target.value}, status={self.status.value}, sent={self.sent}/{self.total})>"
+
+
+class BroadcastDelivery(Base):
+    """Delivery state of one broadcast job for one recipient"""
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (
+        Index("ix_broadcast_deliveries_job_status", "job_id", "status"),
+    )
+
+    job_id: Mapped[int] = mapped_column(Integer, ForeignKey('broadcast_jobs.id', ondelete="CASCADE"), primary_key=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    status: Mapped[DeliveryStatus] = mapped_column(Enum(DeliveryStatus), default=DeliveryStatus.PENDING, nullable=False)
+    error: Mapped[str] = mapped_column(String(255), nullable=True)
+    message_ids: Mapped[list[int]] = mapped_column(ARRAY(BigInteger), nullable=True)  # Copies in the recipient chat
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<BroadcastDelivery(job_id={self.job_id}, chat_id={self.chat_id}, status={self.status.value})>"
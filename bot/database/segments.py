@@ -0,0 +1,41 @@
+import json
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional
+from bot.database.models import ChatType
+
+
+@dataclass
+class Segment:
+    """Broadcast audience filters, compiled to SQL by Database"""
+    # User filters
+    language_code: Optional[str] = None
+    min_coins: Optional[int] = None
+    max_coins: Optional[int] = None
+    registered_from: Optional[datetime] = None
+    registered_to: Optional[datetime] = None
+    referred_by_id: Optional[int] = None
+    # Group filters
+    chat_type: Optional[ChatType] = None
+    bot_is_admin: Optional[bool] = None
+
+    def to_json(self) -> str:
+        data = {key: value for key, value in asdict(self).items() if value is not None}
+        for key in ("registered_from", "registered_to"):
+            if key in data:
+                data[key] = data[key].isoformat()
+        if "chat_type" in data:
+            data["chat_type"] = data["chat_type"].value
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> Optional["Segment"]:
+        if not raw:
+            return None
+        data = json.loads(raw)
+        for key in ("registered_from", "registered_to"):
+            if key in data:
+                data[key] = datetime.fromisoformat(data[key])
+        if "chat_type" in data:
+            data["chat_type"] = ChatType(data["chat_type"])
+        return cls(**data)
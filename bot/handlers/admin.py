@@ -2,6 +2,9 @@ from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from typing import Optional
+from datetime import datetime, timedelta
+from bot.config import TIMEZONE_OFFSET_HOURS
 from bot.database.database import Database
 from bot.database.models import UserRole, TransactionType
 from bot.keyboards.inline import (
@@ -70,28 +73,35 @@ def format_group_info(group, index: int) -> str:
     return info
 
 
+def format_statistics(stats: dict) -> str:
+    """Format admin panel statistics"""
+    return (
+        "📊 <b>Statistika</b>\n\n"
+        "<b>👥 Foydalanuvchilar:</b>\n"
+        f"├ Jami: <b>{stats['users_total']}</b>\n"
+        f"├ Ro'yxatdan o'tgan: <b>{stats['users_registered']}</b>\n"
+        f"├ Adminlar: <b>{stats['users_admins']}</b>\n"
+        f"└ Oddiy userlar: <b>{stats['users_regular']}</b>\n\n"
+        
+        "<b>💬 Guruhlar va Kanallar:</b>\n"
+        f"├ Jami: <b>{stats['groups_total']}</b>\n"
+        f"├ Aktiv: <b>{stats['groups_active']}</b>\n"
+        f"├ Chiqib ketgan: <b>{stats['groups_total'] - stats['groups_active']}</b>\n\n"
+        
+        "<b>📢 Tur bo'yicha:</b>\n"
+        f"├ Kanallar: <b>{stats['channels']}</b>\n"
+        f"├ Superguruhlar: <b>{stats['supergroups']}</b>\n"
+        f"└ Oddiy guruhlar: <b>{stats['groups']}</b>\n\n"
+        
+        "<b>🤖 Bot roli:</b>\n"
+        f"├ Admin: <b>{stats['bot_admin']}</b>\n"
+        f"└ Oddiy a'zo: <b>{stats['bot_member']}</b>"
+    )
+
+
 @router.message(Command("admin"))
-async def cmd_admin(message: Message, db: Database):
+async def cmd_admin(message: Message):
     """Admin panel buyrug'i"""
-    telegram_id = message.from_user.id
-    user = await db.get_user(telegram_id)
-    
-    # Check if user is admin
-    if not user or user.role != UserRole.ADMIN:
-        await message.answer(
-            "❌ Kechirasiz, sizda admin huquqi yo'q!\n\n"
-            "Bu buyruq faqat adminlar uchun."
-        )
-        return
-    
-    # Get statistics
-    all_users = await db.get_all_users()
-    registered_users = [u for u in all_users if u.is_registered]
-    admins = await db.get_all_users(role=UserRole.ADMIN)
-    
-    all_groups = await db.get_all_groups()
-    active_groups = await db.get_all_groups(active_only=True)
-    
     text = (
         "👑 <b>Admin Panel</b>\n\n"
         "Xush kelibsiz, admin! Bu yerda botni boshqarishingiz mumkin.\n\n"
@@ -104,64 +114,34 @@ async def cmd_admin(message: Message, db: Database):
 @router.callback_query(F.data == "admin_stats")
 async def show_statistics(callback: CallbackQuery, db: Database):
     """Statistika ko'rsatish"""
-    # Get all statistics
-    all_users = await db.get_all_users()
-    registered_users = [u for u in all_users if u.is_registered]
-    admins = await db.get_all_users(role=UserRole.ADMIN)
-    regular_users = await db.get_all_users(role=UserRole.USER)
-    
-    all_groups = await db.get_all_groups()
-    active_groups = await db.get_all_groups(active_only=True)
-    
-    # Count bot roles in groups
-    admin_in_groups = sum(1 for g in active_groups if g.bot_is_admin)
-    member_in_groups = sum(1 for g in active_groups if not g.bot_is_admin)
-    
-    # Count chat types
-    channels = sum(1 for g in all_groups if g.chat_type.value == "channel")
-    supergroups = sum(1 for g in all_groups if g.chat_type.value == "supergroup")
-    groups = sum(1 for g in all_groups if g.chat_type.value == "group")
-    
-    text = (
-        "📊 <b>Statistika</b>\n\n"
-        "<b>👥 Foydalanuvchilar:</b>\n"
-        f"├ Jami: <b>{len(all_users)}</b>\n"
-        f"├ Ro'yxatdan o'tgan: <b>{len(registered_users)}</b>\n"
-        f"├ Adminlar: <b>{len(admins)}</b>\n"
-        f"└ Oddiy userlar: <b>{len(regular_users)}</b>\n\n"
-        
-        "<b>💬 Guruhlar va Kanallar:</b>\n"
-        f"├ Jami: <b>{len(all_groups)}</b>\n"
-        f"├ Aktiv: <b>{len(active_groups)}</b>\n"
-        f"├ Chiqib ketgan: <b>{len(all_groups) - len(active_groups)}</b>\n\n"
-        
-        "<b>📢 Tur bo'yicha:</b>\n"
-        f"├ Kanallar: <b>{channels}</b>\n"
-        f"├ Superguruhlar: <b>{supergroups}</b>\n"
-        f"└ Oddiy guruhlar: <b>{groups}</b>\n\n"
-        
-        "<b>🤖 Bot roli:</b>\n"
-        f"├ Admin: <b>{admin_in_groups}</b>\n"
-        f"└ Oddiy a'zo: <b>{member_in_groups}</b>"
-    )
+    text = format_statistics(await db.get_statistics())
     
     await callback.message.edit_text(text, reply_markup=get_stats_keyboard())
     await callback.answer()
 
 
+def parse_list_callback(data: str) -> tuple[str, int, str, Optional[int]]:
+    """Parse "<prefix>_page_<filter>_<page>_<n|p>_<cursor>" into filter, page, direction, cursor"""
+    parts = data.split("_")
+    if len(parts) != 6 or parts[1] != "page":
+        # Opened from the statistics page
+        return "all", 1, "n", None
+    _, _, list_filter, page, direction, cursor = parts
+    return list_filter, int(page), direction, int(cursor) or None
+
+
 @router.callback_query(F.data.startswith("admin_users") | F.data.startswith("users_page_"))
 async def show_users_list(callback: CallbackQuery, db: Database):
     """Userlar ro'yxatini ko'rsatish"""
-    # Get page number
-    if callback.data.startswith("users_page_"):
-        page = int(callback.data.split("_")[-1])
-    else:
-        page = 1
+    list_filter, page, direction, cursor = parse_list_callback(callback.data)
     
-    # Get all users
-    all_users = await db.get_all_users()
+    # Only one page is read, the cursor comes from the pressed button
+    if direction == "p":
+        page_users = await db.get_users_page(list_filter, before_id=cursor, limit=USERS_PER_PAGE)
+    else:
+        page_users = await db.get_users_page(list_filter, after_id=cursor, limit=USERS_PER_PAGE)
     
-    if not all_users:
+    if not page_users and list_filter == "all":
         await callback.message.edit_text(
             "📭 Hozircha userlar yo'q.",
             reply_markup=get_back_button()
@@ -170,16 +150,10 @@ async def show_users_list(callback: CallbackQuery, db: Database):
         return
     
     # Calculate pagination
-    total_users = len(all_users)
-    total_pages = math.ceil(total_users / USERS_PER_PAGE)
-    
-    # Ensure page is valid
+    total_users = await db.count_users(list_filter)
+    total_pages = max(1, math.ceil(total_users / USERS_PER_PAGE))
     page = max(1, min(page, total_pages))
-    
-    # Get users for current page
     start_idx = (page - 1) * USERS_PER_PAGE
-    end_idx = start_idx + USERS_PER_PAGE
-    page_users = all_users[start_idx:end_idx]
     
     # Format message
     text = f"👥 <b>Foydalanuvchilar</b> (Sahifa {page}/{total_pages})\n\n"
@@ -193,7 +167,13 @@ async def show_users_list(callback: CallbackQuery, db: Database):
     
     await callback.message.edit_text(
         text,
-        reply_markup=get_users_navigation(page, total_pages)
+        reply_markup=get_users_navigation(
+            page,
+            total_pages,
+            list_filter,
+            first_id=page_users[0].id if page_users else 0,
+            last_id=page_users[-1].id if page_users else 0
+        )
     )
     await callback.answer()
 
@@ -201,16 +181,15 @@ async def show_users_list(callback: CallbackQuery, db: Database):
 @router.callback_query(F.data.startswith("admin_groups") | F.data.startswith("groups_page_"))
 async def show_groups_list(callback: CallbackQuery, db: Database):
     """Guruhlar ro'yxatini ko'rsatish"""
-    # Get page number
-    if callback.data.startswith("groups_page_"):
-        page = int(callback.data.split("_")[-1])
-    else:
-        page = 1
+    list_filter, page, direction, cursor = parse_list_callback(callback.data)
     
-    # Get all groups
-    all_groups = await db.get_all_groups()
+    # Only one page is read, the cursor comes from the pressed button
+    if direction == "p":
+        page_groups = await db.get_groups_page(list_filter, before_id=cursor, limit=GROUPS_PER_PAGE)
+    else:
+        page_groups = await db.get_groups_page(list_filter, after_id=cursor, limit=GROUPS_PER_PAGE)
     
-    if not all_groups:
+    if not page_groups and list_filter == "all":
         await callback.message.edit_text(
             "📭 Hozircha guruhlar yo'q.",
             reply_markup=get_back_button()
@@ -219,16 +198,10 @@ async def show_groups_list(callback: CallbackQuery, db: Database):
         return
     
     # Calculate pagination
-    total_groups = len(all_groups)
-    total_pages = math.ceil(total_groups / GROUPS_PER_PAGE)
-    
-    # Ensure page is valid
+    total_groups = await db.count_groups(list_filter)
+    total_pages = max(1, math.ceil(total_groups / GROUPS_PER_PAGE))
     page = max(1, min(page, total_pages))
-    
-    # Get groups for current page
     start_idx = (page - 1) * GROUPS_PER_PAGE
-    end_idx = start_idx + GROUPS_PER_PAGE
-    page_groups = all_groups[start_idx:end_idx]
     
     # Format message
     text = f"💬 <b>Guruhlar va Kanallar</b> (Sahifa {page}/{total_pages})\n\n"
@@ -244,7 +217,13 @@ async def show_groups_list(callback: CallbackQuery, db: Database):
     
     await callback.message.edit_text(
         text,
-        reply_markup=get_groups_navigation(page, total_pages)
+        reply_markup=get_groups_navigation(
+            page,
+            total_pages,
+            list_filter,
+            first_id=page_groups[0].id if page_groups else 0,
+            last_id=page_groups[-1].id if page_groups else 0
+        )
     )
     await callback.answer()
 
@@ -265,46 +244,7 @@ async def back_from_stats(callback: CallbackQuery):
 @router.callback_query(F.data == "users_back")
 async def back_from_users(callback: CallbackQuery, db: Database):
     """Users dan statistikaga qaytish"""
-    # Get all statistics
-    all_users = await db.get_all_users()
-    registered_users = [u for u in all_users if u.is_registered]
-    admins = await db.get_all_users(role=UserRole.ADMIN)
-    regular_users = await db.get_all_users(role=UserRole.USER)
-    
-    all_groups = await db.get_all_groups()
-    active_groups = await db.get_all_groups(active_only=True)
-    
-    # Count bot roles in groups
-    admin_in_groups = sum(1 for g in active_groups if g.bot_is_admin)
-    member_in_groups = sum(1 for g in active_groups if not g.bot_is_admin)
-    
-    # Count chat types
-    channels = sum(1 for g in all_groups if g.chat_type.value == "channel")
-    supergroups = sum(1 for g in all_groups if g.chat_type.value == "supergroup")
-    groups = sum(1 for g in all_groups if g.chat_type.value == "group")
-    
-    text = (
-        "📊 <b>Statistika</b>\n\n"
-        "<b>👥 Foydalanuvchilar:</b>\n"
-        f"├ Jami: <b>{len(all_users)}</b>\n"
-        f"├ Ro'yxatdan o'tgan: <b>{len(registered_users)}</b>\n"
-        f"├ Adminlar: <b>{len(admins)}</b>\n"
-        f"└ Oddiy userlar: <b>{len(regular_users)}</b>\n\n"
-        
-        "<b>💬 Guruhlar va Kanallar:</b>\n"
-        f"├ Jami: <b>{len(all_groups)}</b>\n"
-        f"├ Aktiv: <b>{len(active_groups)}</b>\n"
-        f"├ Chiqib ketgan: <b>{len(all_groups) - len(active_groups)}</b>\n\n"
-        
-        "<b>📢 Tur bo'yicha:</b>\n"
-        f"├ Kanallar: <b>{channels}</b>\n"
-        f"├ Superguruhlar: <b>{supergroups}</b>\n"
-        f"└ Oddiy guruhlar: <b>{groups}</b>\n\n"
-        
-        "<b>🤖 Bot roli:</b>\n"
-        f"├ Admin: <b>{admin_in_groups}</b>\n"
-        f"└ Oddiy a'zo: <b>{member_in_groups}</b>"
-    )
+    text = format_statistics(await db.get_statistics())
     
     await callback.message.edit_text(text, reply_markup=get_stats_keyboard())
     await callback.answer()
@@ -313,46 +253,7 @@ async def back_from_users(callback: CallbackQuery, db: Database):
 @router.callback_query(F.data == "groups_back")
 async def back_from_groups(callback: CallbackQuery, db: Database):
     """Groups dan statistikaga qaytish"""
-    # Get all statistics
-    all_users = await db.get_all_users()
-    registered_users = [u for u in all_users if u.is_registered]
-    admins = await db.get_all_users(role=UserRole.ADMIN)
-    regular_users = await db.get_all_users(role=UserRole.USER)
-    
-    all_groups = await db.get_all_groups()
-    active_groups = await db.get_all_groups(active_only=True)
-    
-    # Count bot roles in groups
-    admin_in_groups = sum(1 for g in active_groups if g.bot_is_admin)
-    member_in_groups = sum(1 for g in active_groups if not g.bot_is_admin)
-    
-    # Count chat types
-    channels = sum(1 for g in all_groups if g.chat_type.value == "channel")
-    supergroups = sum(1 for g in all_groups if g.chat_type.value == "supergroup")
-    groups = sum(1 for g in all_groups if g.chat_type.value == "group")
-    
-    text = (
-        "📊 <b>Statistika</b>\n\n"
-        "<b>👥 Foydalanuvchilar:</b>\n"
-        f"├ Jami: <b>{len(all_users)}</b>\n"
-        f"├ Ro'yxatdan o'tgan: <b>{len(registered_users)}</b>\n"
-        f"├ Adminlar: <b>{len(admins)}</b>\n"
-        f"└ Oddiy userlar: <b>{len(regular_users)}</b>\n\n"
-        
-        "<b>💬 Guruhlar va Kanallar:</b>\n"
-        f"├ Jami: <b>{len(all_groups)}</b>\n"
-        f"├ Aktiv: <b>{len(active_groups)}</b>\n"
-        f"├ Chiqib ketgan: <b>{len(all_groups) - len(active_groups)}</b>\n\n"
-        
-        "<b>📢 Tur bo'yicha:</b>\n"
-        f"├ Kanallar: <b>{channels}</b>\n"
-        f"├ Superguruhlar: <b>{supergroups}</b>\n"
-        f"└ Oddiy guruhlar: <b>{groups}</b>\n\n"
-        
-        "<b>🤖 Bot roli:</b>\n"
-        f"├ Admin: <b>{admin_in_groups}</b>\n"
-        f"└ Oddiy a'zo: <b>{member_in_groups}</b>"
-    )
+    text = format_statistics(await db.get_statistics())
     
     await callback.message.edit_text(text, reply_markup=get_stats_keyboard())
     await callback.answer()
@@ -365,7 +266,7 @@ async def close_admin_panel(callback: CallbackQuery):
     await callback.answer("Admin panel yopildi ✅")
 
 
-@router.callback_query(F.data.in_(["users_current", "groups_current"]))
+@router.callback_query(F.data.in_(["users_current", "groups_current", "transactions_current"]))
 async def ignore_current_page(callback: CallbackQuery):
     """Current page tugmasini ignore qilish"""
     await callback.answer()
@@ -451,19 +352,9 @@ async def process_phone_for_coins(message: Message, state: FSMContext, db: Datab
         await message.answer("❌ Telefon raqam kiriting!")
         return
     
-    # Find all users
-    found_users = []
-    not_found = []
-    
-    for phone in phone_list:
-        user = await db.get_user_by_phone(phone)
-        if user:
-            found_users.append({
-                'user': user,
-                'phone': phone
-            })
-        else:
-            not_found.append(phone)
+    # Find all users in one query
+    found, not_found = await db.get_users_by_phones(phone_list)
+    found_users = [{'user': user, 'phone': phone} for phone, user in found]
     
     if not found_users:
         await message.answer(
@@ -538,32 +429,25 @@ async def process_coin_amount(message: Message, state: FSMContext, db: Database)
     if is_bulk:
         # Multiple users
         user_ids = state_data.get("user_ids", [])
-        user_names = state_data.get("user_names", [])
-        
-        success_count = 0
-        failed_count = 0
         
-        for user_id, user_name in zip(user_ids, user_names):
-            if action == "add":
-                success = await db.add_coins(
-                    user_id=user_id,
-                    amount=amount,
-                    transaction_type=TransactionType.ADMIN_ADD,
-                    description=f"Admin tomonidan qo'shildi (bulk)",
-                    admin_id=admin.id
-                )
-            else:  # remove
-                success = await db.remove_coins(
-                    user_id=user_id,
-                    amount=amount,
-                    description=f"Admin tomonidan olib tashlandi (bulk)",
-                    admin_id=admin.id
-                )
-            
-            if success:
-                success_count += 1
-            else:
-                failed_count += 1
+        # One atomic UPDATE + INSERT for all users
+        if action == "add":
+            success_count = await db.add_coins_bulk(
+                user_ids=user_ids,
+                amount=amount,
+                transaction_type=TransactionType.ADMIN_ADD,
+                description=f"Admin tomonidan qo'shildi (bulk)",
+                admin_id=admin.id
+            )
+        else:  # remove
+            success_count = await db.remove_coins_bulk(
+                user_ids=user_ids,
+                amount=amount,
+                description=f"Admin tomonidan olib tashlandi (bulk)",
+                admin_id=admin.id
+            )
+        unique_count = len(set(user_ids))
+        failed_count = unique_count - success_count
         
         action_symbol = "➕" if action == "add" else "➖"
         action_word = "qo'shildi" if action == "add" else "olib tashlandi"
@@ -571,7 +455,7 @@ async def process_coin_amount(message: Message, state: FSMContext, db: Database)
         await message.answer(
             f"✅ <b>Bulk operatsiya yakunlandi!</b>\n\n"
             f"{action_symbol} Miqdor: <b>{amount} KiberCoin</b>\n"
-            f"👥 Jami userlar: <b>{len(user_ids)}</b>\n"
+            f"👥 Jami userlar: <b>{unique_count}</b>\n"
             f"✅ Muvaffaqiyatli: <b>{success_count}</b>\n"
             f"❌ Xatolik: <b>{failed_count}</b>\n\n"
             f"Barcha userlarga {amount} KiberCoin {action_word}!",
@@ -585,7 +469,8 @@ async def process_coin_amount(message: Message, state: FSMContext, db: Database)
         
         if action == "add":
             # Add coins
-            success = await db.add_coins(
+            # New balance comes back from the same UPDATE
+            balance = await db.add_coins(
                 user_id=user_id,
                 amount=amount,
                 transaction_type=TransactionType.ADMIN_ADD,
@@ -593,19 +478,12 @@ async def process_coin_amount(message: Message, state: FSMContext, db: Database)
                 admin_id=admin.id
             )
             
-            if success:
-                # Get updated user
-                async with db.session_maker() as session:
-                    from sqlalchemy import select
-                    from bot.database.models import User
-                    result = await session.execute(select(User).where(User.id == user_id))
-                    user = result.scalar_one_or_none()
-                
+            if balance is not None:
                 await message.answer(
                     f"✅ Muvaffaqiyatli!\n\n"
                     f"👤 User: <b>{user_name}</b>\n"
                     f"➕ Qo'shildi: <b>{amount} KiberCoin</b>\n"
-                    f"💰 Yangi balans: <b>{user.coins} KiberCoin</b>",
+                    f"💰 Yangi balans: <b>{balance} KiberCoin</b>",
                     parse_mode="HTML"
                 )
             else:
@@ -613,26 +491,20 @@ async def process_coin_amount(message: Message, state: FSMContext, db: Database)
         
         else:  # remove
             # Remove coins
-            success = await db.remove_coins(
+            # New balance comes back from the same UPDATE
+            balance = await db.remove_coins(
                 user_id=user_id,
                 amount=amount,
                 description=f"Admin tomonidan olib tashlandi",
                 admin_id=admin.id
             )
             
-            if success:
-                # Get updated user
-                async with db.session_maker() as session:
-                    from sqlalchemy import select
-                    from bot.database.models import User
-                    result = await session.execute(select(User).where(User.id == user_id))
-                    user = result.scalar_one_or_none()
-                
+            if balance is not None:
                 await message.answer(
                     f"✅ Muvaffaqiyatli!\n\n"
                     f"👤 User: <b>{user_name}</b>\n"
                     f"➖ Olib tashlandi: <b>{amount} KiberCoin</b>\n"
-                    f"💰 Yangi balans: <b>{user.coins} KiberCoin</b>",
+                    f"💰 Yangi balans: <b>{balance} KiberCoin</b>",
                     parse_mode="HTML"
                 )
             else:
@@ -641,40 +513,79 @@ async def process_coin_amount(message: Message, state: FSMContext, db: Database)
     await state.clear()
 
 
+TRANSACTION_TYPE_FILTERS = {
+    "a": None,
+    "r": TransactionType.REFERRAL_BONUS,
+    "p": TransactionType.ADMIN_ADD,
+    "m": TransactionType.ADMIN_REMOVE,
+}
+
+# Period filter -> days back (0 = since local midnight)
+TRANSACTION_PERIOD_DAYS = {"d": 0, "w": 7, "m": 30}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_transaction_cursor(tx) -> str:
+    """(created_at, id) keyset cursor for callback data"""
+    return f"{(tx.created_at - _EPOCH) // timedelta(microseconds=1)}_{tx.id}"
+
+
+def transactions_period_start(period: str) -> Optional[datetime]:
+    """UTC start of the period filter"""
+    if period not in TRANSACTION_PERIOD_DAYS:
+        return None
+    days = TRANSACTION_PERIOD_DAYS[period]
+    if days:
+        return datetime.utcnow() - timedelta(days=days)
+    offset = timedelta(hours=TIMEZONE_OFFSET_HOURS)
+    local_midnight = (datetime.utcnow() + offset).replace(hour=0, minute=0, second=0, microsecond=0)
+    return local_midnight - offset
+
+
 @router.callback_query(F.data.startswith("coin_transactions") | F.data.startswith("transactions_page_"))
 async def show_all_transactions(callback: CallbackQuery, db: Database):
     """Barcha tranzaksiyalarni ko'rsatish"""
-    # Parse page number
-    page = 1
-    if callback.data.startswith("transactions_page_"):
-        page = int(callback.data.split("_")[-1])
-    
-    # Get all transactions
-    all_transactions = await db.get_transactions(limit=1000)
+    # transactions_page_<filter>_<page>_<n|p>_<created_us>_<id>
+    parts = callback.data.split("_")
+    if len(parts) == 7:
+        _, _, tx_filter, page, direction, created_us, tx_id = parts
+        page = int(page)
+        cursor = (_EPOCH + timedelta(microseconds=int(created_us)), int(tx_id)) if int(tx_id) else None
+    else:
+        tx_filter, page, direction, cursor = "aaa", 1, "n", None
+    
+    type_code, admin_code, period = tx_filter
+    admin_id = None
+    if admin_code == "s":
+        admin = await db.get_user(callback.from_user.id)
+        admin_id = admin.id if admin else None
+    filters = {
+        "transaction_type": TRANSACTION_TYPE_FILTERS.get(type_code),
+        "admin_id": admin_id,
+        "date_from": transactions_period_start(period)
+    }
     
-    # Pagination
+    # One query for the page, user names included
     items_per_page = 10
-    total_pages = max(1, math.ceil(len(all_transactions) / items_per_page))
-    page = max(1, min(page, total_pages))
-    
-    start_idx = (page - 1) * items_per_page
-    end_idx = start_idx + items_per_page
-    page_transactions = all_transactions[start_idx:end_idx]
+    if direction == "p":
+        page_transactions = await db.get_transactions_page(newer_than=cursor, limit=items_per_page, **filters)
+    else:
+        page_transactions = await db.get_transactions_page(older_than=cursor, limit=items_per_page, **filters)
     
-    if not page_transactions:
+    if not page_transactions and tx_filter == "aaa":
         await callback.answer("📭 Tranzaksiyalar yo'q", show_alert=True)
         return
     
+    # Pagination
+    total_pages = max(1, math.ceil(await db.count_transactions(**filters) / items_per_page))
+    page = max(1, min(page, total_pages))
+    
     text = f"📊 <b>Barcha Tranzaksiyalar</b> (Sahifa {page}/{total_pages})\n\n"
+    if not page_transactions:
+        text += "📭 Tranzaksiyalar yo'q\n"
     
-    for tx in page_transactions:
-        # Get user info
-        async with db.session_maker() as session:
-            from sqlalchemy import select
-            from bot.database.models import User
-            result = await session.execute(select(User).where(User.id == tx.user_id))
-            user = result.scalar_one_or_none()
-        
+    for tx, user_name in page_transactions:
         amount_str = f"+{tx.amount}" if tx.amount > 0 else str(tx.amount)
         emoji = "💰" if tx.amount > 0 else "💸"
         
@@ -684,7 +595,7 @@ async def show_all_transactions(callback: CallbackQuery, db: Database):
             "admin_remove": "Admin ayirdi"
         }.get(tx.transaction_type.value, "Noma'lum")
         
-        user_name = user.preferred_name or user.first_name if user else "Noma'lum"
+        user_name = user_name or "Noma'lum"
         date_str = tx.created_at.strftime("%d.%m.%Y %H:%M")
         
         text += f"{emoji} <b>{amount_str}</b> - {user_name}\n"
@@ -695,7 +606,13 @@ async def show_all_transactions(callback: CallbackQuery, db: Database):
     
     await callback.message.edit_text(
         text,
-        reply_markup=get_transactions_navigation(page, total_pages),
+        reply_markup=get_transactions_navigation(
+            page,
+            total_pages,
+            tx_filter,
+            first_cursor=encode_transaction_cursor(page_transactions[0][0]) if page_transactions else "0_0",
+            last_cursor=encode_transaction_cursor(page_transactions[-1][0]) if page_transactions else "0_0"
+        ),
         parse_mode="HTML"
     )
     await callback.answer()
@@ -718,17 +635,3 @@ async def coin_back_to_admin(callback: CallbackQuery, db: Database):
     
     await callback.message.edit_text(text, reply_markup=get_admin_main_menu())
     await callback.answer()
-
-
-@router.message(Command("cancel"))
-async def cancel_coin_operation(message: Message, state: FSMContext):
-    """Coin operatsiyasini bekor qilish"""
-    current_state = await state.get_state()
-    if current_state is None:
-        return
-    
-    await state.clear()
-    await message.answer(
-        "❌ Operatsiya bekor qilindi!",
-        parse_mode="HTML"
-    )
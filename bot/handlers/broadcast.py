@@ -1,27 +1,193 @@
 import asyncio
+import html
+from datetime import datetime, timedelta
+from typing import Optional
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
+from bot.config import TIMEZONE_OFFSET_HOURS
 from bot.database.database import Database
-from bot.database.models import UserRole
-from bot.keyboards.inline import get_broadcast_target_keyboard
+from bot.database.models import BroadcastTarget, ChatType
+from bot.database.segments import Segment
+from bot.keyboards.inline import (
+    get_broadcast_start_keyboard,
+    get_broadcast_target_keyboard,
+    get_broadcast_progress_keyboard,
+    get_broadcast_segment_confirm_keyboard,
+    get_broadcast_delete_confirm_keyboard
+)
+from bot.services.broadcast_jobs import BroadcastManager
+from bot.services.templates import MessageTemplate, TEMPLATE_FIELDS
 from bot.states.broadcast import BroadcastStates
 
 router = Router()
 
+# Album parts arrive as separate messages; wait this long for the rest
+ALBUM_COLLECT_SECONDS = 1.0
 
-@router.callback_query(F.data == "admin_broadcast")
-async def start_broadcast(callback: CallbackQuery, state: FSMContext, db: Database):
-    """Broadcast jarayonini boshlash"""
-    telegram_id = callback.from_user.id
-    user = await db.get_user(telegram_id)
+# media_group_id -> message_ids collected so far
+_albums: dict[str, list[int]] = {}
+
+
+def parse_schedule(text: str) -> Optional[tuple[datetime, Optional[int]]]:
+    """Parse "DD.MM.YYYY HH:MM [daqiqa]" or "HH:MM [daqiqa]" (local time) to UTC"""
+    parts = text.split()
+    offset = timedelta(hours=TIMEZONE_OFFSET_HOURS)
+    now_local = datetime.utcnow() + offset
+    try:
+        if len(parts) >= 2 and "." in parts[0]:
+            local = datetime.strptime(f"{parts[0]} {parts[1]}", "%d.%m.%Y %H:%M")
+            rest = parts[2:]
+        else:
+            time_part = datetime.strptime(parts[0], "%H:%M")
+            local = now_local.replace(hour=time_part.hour, minute=time_part.minute, second=0, microsecond=0)
+            if local <= now_local:
+                local += timedelta(days=1)
+            rest = parts[1:]
+        spread_minutes = int(rest[0]) if rest else None
+    except (ValueError, IndexError):
+        return None
+
+    if local <= now_local or len(rest) > 1 or (spread_minutes is not None and spread_minutes <= 0):
+        return None
+    return local - offset, spread_minutes
+
+
+def format_local_time(utc_time: datetime) -> str:
+    """UTC vaqtni adminlar vaqtida ko'rsatish"""
+    return (utc_time + timedelta(hours=TIMEZONE_OFFSET_HOURS)).strftime("%d.%m.%Y %H:%M")
+
+
+def parse_segment(text: str) -> Optional[tuple[BroadcastTarget, Segment, Optional[str]]]:
+    """Parse "users lang=uz coins=10-100 date=01.01.2025-31.01.2025 ref=CODE" or "groups type=supergroup admin=yes"
+
+    Returns target, segment and the referral code to resolve (if any).
+    """
+    parts = text.split()
+    if not parts or parts[0].lower() not in ("users", "groups"):
+        return None
+    target = BroadcastTarget.USERS if parts[0].lower() == "users" else BroadcastTarget.GROUPS
+    segment = Segment()
+    referral_code = None
+    offset = timedelta(hours=TIMEZONE_OFFSET_HOURS)
+    
+    try:
+        for part in parts[1:]:
+            key, value = part.split("=", 1)
+            key = key.lower()
+            if target == BroadcastTarget.USERS and key == "lang":
+                segment.language_code = value.lower()
+            elif target == BroadcastTarget.USERS and key == "coins":
+                low, _, high = value.partition("-")
+                segment.min_coins = int(low) if low else None
+                segment.max_coins = int(high) if high else None
+            elif target == BroadcastTarget.USERS and key == "date":
+                # Whole local days, the end day is included
+                low, _, high = value.partition("-")
+                if low:
+                    segment.registered_from = datetime.strptime(low, "%d.%m.%Y") - offset
+                if high:
+                    segment.registered_to = datetime.strptime(high, "%d.%m.%Y") + timedelta(days=1) - offset
+            elif target == BroadcastTarget.USERS and key == "ref":
+                referral_code = value
+            elif target == BroadcastTarget.GROUPS and key == "type":
+                segment.chat_type = ChatType(value.lower())
+            elif target == BroadcastTarget.GROUPS and key == "admin":
+                segment.bot_is_admin = value.lower() in ("yes", "ha", "1")
+            else:
+                return None
+    except ValueError:
+        return None
+    
+    return target, segment, referral_code
+
+
+def format_segment(segment: Optional[Segment]) -> str:
+    """Segmentni parse_segment sintaksisida ko'rsatish"""
+    if not segment:
+        return "hammasi"
+    offset = timedelta(hours=TIMEZONE_OFFSET_HOURS)
+    parts = []
+    if segment.language_code:
+        parts.append(f"lang={segment.language_code}")
+    if segment.min_coins is not None or segment.max_coins is not None:
+        low = segment.min_coins if segment.min_coins is not None else ""
+        high = segment.max_coins if segment.max_coins is not None else ""
+        parts.append(f"coins={low}-{high}")
+    if segment.registered_from or segment.registered_to:
+        low = (segment.registered_from + offset).strftime("%d.%m.%Y") if segment.registered_from else ""
+        high = (
+            (segment.registered_to + offset - timedelta(days=1)).strftime("%d.%m.%Y")
+            if segment.registered_to else ""
+        )
+        parts.append(f"date={low}-{high}")
+    if segment.referred_by_id is not None:
+        parts.append(f"ref=#{segment.referred_by_id}")
+    if segment.chat_type:
+        parts.append(f"type={segment.chat_type.value}")
+    if segment.bot_is_admin is not None:
+        parts.append(f"admin={'yes' if segment.bot_is_admin else 'no'}")
+    # lang= comes from admin input, the result goes into HTML messages
+    return html.escape(" ".join(parts)) or "hammasi"
+
+
+def get_segment(data: dict, target: BroadcastTarget) -> Optional[Segment]:
+    """FSM'dagi segment, agar shu target uchun tanlangan bo'lsa"""
+    if data.get("segment_target") != target.value:
+        return None
+    return Segment.from_json(data.get("segment"))
+
+
+async def create_scheduled_job(
+    callback: CallbackQuery,
+    state: FSMContext,
+    db: Database,
+    target: BroadcastTarget,
+    data: dict
+) -> None:
+    """Rejalashtirilgan broadcastni saqlash"""
+    scheduled_at = datetime.fromisoformat(data["scheduled_at"])
+    spread_minutes = data.get("spread_minutes")
     
-    # Check if user is admin
-    if not user or user.role != UserRole.ADMIN:
-        await callback.answer("❌ Sizda admin huquqi yo'q!", show_alert=True)
+    if scheduled_at <= datetime.utcnow():
+        await callback.answer("❌ Rejalashtirilgan vaqt o'tib ketdi! Qaytadan boshlang.", show_alert=True)
+        await state.clear()
         return
     
+    # Recipients are selected when the job fires
+    job = await db.create_broadcast_job(
+        admin_telegram_id=callback.from_user.id,
+        target=target,
+        from_chat_id=data["chat_id"],
+        message_id=data["message_id"],
+        message_ids=data.get("message_ids"),
+        status_chat_id=callback.message.chat.id,
+        status_message_id=callback.message.message_id,
+        scheduled_at=scheduled_at,
+        spread_minutes=spread_minutes,
+        segment=get_segment(data, target),
+        template=data.get("template")
+    )
+    
+    target_text = "👥 Users" if target == BroadcastTarget.USERS else "💬 Groups/Channels"
+    spread_text = f"\n⏳ {spread_minutes} daqiqa davomida yuboriladi" if spread_minutes else ""
+    await callback.message.edit_text(
+        f"⏰ <b>Broadcast rejalashtirildi!</b>\n\n"
+        f"🎯 Target: <b>{target_text}</b>\n"
+        f"🔎 Segment: <code>{format_segment(get_segment(data, target))}</code>\n"
+        f"🕒 Vaqt: <b>{format_local_time(scheduled_at)}</b>"
+        f"{spread_text}",
+        reply_markup=get_broadcast_progress_keyboard(job.id)
+    )
+    
+    await state.clear()
+    await callback.answer("⏰ Rejalashtirildi!")
+
+
+@router.callback_query(F.data == "admin_broadcast")
+async def start_broadcast(callback: CallbackQuery, state: FSMContext):
+    """Broadcast jarayonini boshlash"""
     await callback.message.edit_text(
         "📢 <b>Broadcast</b>\n\n"
         "Yubormoqchi bo'lgan kontentingizni yuboring:\n\n"
@@ -33,9 +199,12 @@ async def start_broadcast(callback: CallbackQuery, state: FSMContext, db: Databa
         "✅ Voice/Video xabar\n"
         "✅ Sticker\n"
         "✅ Aralash (matn + media)\n\n"
-        "Kontentni yuboring:"
+        "Kontentni yuboring:",
+        reply_markup=get_broadcast_start_keyboard()
     )
     
+    # New flow: drop schedule, segment and template left by an abandoned one
+    await state.clear()
     await state.set_state(BroadcastStates.waiting_for_content)
     await callback.answer()
 
@@ -43,10 +212,38 @@ async def start_broadcast(callback: CallbackQuery, state: FSMContext, db: Databa
 @router.message(BroadcastStates.waiting_for_content)
 async def receive_broadcast_content(message: Message, state: FSMContext):
     """Broadcast kontentini qabul qilish"""
+    if message.media_group_id:
+        # Collect the whole album into one broadcast payload
+        album = _albums.setdefault(message.media_group_id, [])
+        album.append(message.message_id)
+        if len(album) > 1:
+            # The first part of the album answers for all of them
+            return
+        
+        await asyncio.sleep(ALBUM_COLLECT_SECONDS)
+        message_ids = sorted(_albums.pop(message.media_group_id))
+        
+        await state.update_data(
+            message_id=message_ids[0],
+            message_ids=message_ids,
+            chat_id=message.chat.id,
+            template=None
+        )
+        
+        await message.answer(
+            f"✅ Kontent qabul qilindi!\n\n"
+            f"Turi: 🗂 Albom ({len(message_ids)} ta media)\n\n"
+            f"Kimga yuborish kerak?",
+            reply_markup=get_broadcast_target_keyboard()
+        )
+        return
+    
     # Save message_id and chat_id for later copying
     await state.update_data(
         message_id=message.message_id,
-        chat_id=message.chat.id
+        message_ids=None,
+        chat_id=message.chat.id,
+        template=None
     )
     
     # Determine content type
@@ -79,10 +276,11 @@ async def receive_broadcast_content(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data == "broadcast_users")
-async def broadcast_to_users(callback: CallbackQuery, state: FSMContext, db: Database):
+async def broadcast_to_users(callback: CallbackQuery, state: FSMContext, db: Database, broadcast_manager: BroadcastManager):
     """Barcha userlarga yuborish"""
     data = await state.get_data()
     message_id = data.get("message_id")
+    message_ids = data.get("message_ids")
     chat_id = data.get("chat_id")
     
     if not message_id or not chat_id:
@@ -90,56 +288,53 @@ async def broadcast_to_users(callback: CallbackQuery, state: FSMContext, db: Dat
         await state.clear()
         return
     
-    # Get all registered users
-    all_users = await db.get_all_users()
-    registered_users = [u for u in all_users if u.is_registered]
+    if data.get("scheduled_at"):
+        await create_scheduled_job(callback, state, db, BroadcastTarget.USERS, data)
+        return
     
-    await callback.message.edit_text(
-        f"📤 Yuborilmoqda...\n\n"
-        f"Jami: {len(registered_users)} ta user\n\n"
-        f"⏳ Iltimos kuting..."
-    )
-    
-    success = 0
-    failed = 0
-    
-    for user in registered_users:
-        try:
-            # Copy message (special forward without "Forwarded from")
-            await callback.bot.copy_message(
-                chat_id=user.telegram_id,
-                from_chat_id=chat_id,
-                message_id=message_id
-            )
-            success += 1
-            
-            # Small delay to avoid flood limits
-            await asyncio.sleep(0.05)
-            
-        except Exception as e:
-            failed += 1
-            # Silently continue on error (user blocked bot, deleted account, etc.)
-            continue
+    # Only chat ids of registered users (and the segment), filtered in SQL
+    segment = get_segment(data, BroadcastTarget.USERS)
+    recipients = await db.get_user_chat_ids(segment=segment)
+    
+    if not recipients:
+        await callback.answer("❌ Userlar topilmadi!", show_alert=True)
+        await state.clear()
+        return
+    
+    job = await db.create_broadcast_job(
+        admin_telegram_id=callback.from_user.id,
+        target=BroadcastTarget.USERS,
+        from_chat_id=chat_id,
+        message_id=message_id,
+        message_ids=message_ids,
+        recipients=recipients,
+        segment=segment,
+        template=data.get("template"),
+        status_chat_id=callback.message.chat.id,
+        status_message_id=callback.message.message_id
+    )
     
     await callback.message.edit_text(
-        f"✅ <b>Broadcast yakunlandi!</b>\n\n"
-        f"👥 Target: <b>Users</b>\n\n"
-        f"📊 Natijalar:\n"
-        f"├ Muvaffaqiyatli: <b>{success}</b>\n"
-        f"├ Muvaffaqiyatsiz: <b>{failed}</b>\n"
-        f"└ Jami: <b>{len(registered_users)}</b>\n\n"
-        f"✨ Barcha foydalanuvchilarga yetkazildi!"
+        f"📤 Yuborilmoqda...\n\n"
+        f"Jami: {len(recipients)} ta user\n"
+        f"Segment: <code>{format_segment(segment)}</code>\n\n"
+        f"⏳ Iltimos kuting...",
+        reply_markup=get_broadcast_progress_keyboard(job.id)
     )
     
+    # Runs in background, results are reported by editing the message above
+    broadcast_manager.start(job.id)
+    
     await state.clear()
-    await callback.answer("✅ Yuborildi!")
+    await callback.answer("✅ Broadcast boshlandi!")
 
 
 @router.callback_query(F.data == "broadcast_groups")
-async def broadcast_to_groups(callback: CallbackQuery, state: FSMContext, db: Database):
+async def broadcast_to_groups(callback: CallbackQuery, state: FSMContext, db: Database, broadcast_manager: BroadcastManager):
     """Barcha guruh va kanallarga yuborish"""
     data = await state.get_data()
     message_id = data.get("message_id")
+    message_ids = data.get("message_ids")
     chat_id = data.get("chat_id")
     
     if not message_id or not chat_id:
@@ -147,56 +342,256 @@ async def broadcast_to_groups(callback: CallbackQuery, state: FSMContext, db: Da
         await state.clear()
         return
     
-    # Get all active groups
-    active_groups = await db.get_all_groups(active_only=True)
+    if data.get("template"):
+        await callback.answer("❌ Shablon faqat userlar uchun!", show_alert=True)
+        return
+    
+    if data.get("scheduled_at"):
+        await create_scheduled_job(callback, state, db, BroadcastTarget.GROUPS, data)
+        return
+    
+    # Get chat ids of active groups (and the segment)
+    segment = get_segment(data, BroadcastTarget.GROUPS)
+    recipients = await db.get_group_chat_ids(active_only=True, segment=segment)
     
-    if not active_groups:
+    if not recipients:
         await callback.answer("❌ Aktiv guruhlar topilmadi!", show_alert=True)
         await state.clear()
         return
     
+    job = await db.create_broadcast_job(
+        admin_telegram_id=callback.from_user.id,
+        target=BroadcastTarget.GROUPS,
+        from_chat_id=chat_id,
+        message_id=message_id,
+        message_ids=message_ids,
+        recipients=recipients,
+        segment=segment,
+        status_chat_id=callback.message.chat.id,
+        status_message_id=callback.message.message_id
+    )
+    
     await callback.message.edit_text(
         f"📤 Yuborilmoqda...\n\n"
-        f"Jami: {len(active_groups)} ta guruh/kanal\n\n"
-        f"⏳ Iltimos kuting..."
-    )
-    
-    success = 0
-    failed = 0
-    
-    for group in active_groups:
-        try:
-            # Copy message (special forward without "Forwarded from")
-            await callback.bot.copy_message(
-                chat_id=group.chat_id,
-                from_chat_id=chat_id,
-                message_id=message_id
-            )
-            success += 1
-            
-            # Delay to avoid flood limits
-            await asyncio.sleep(0.1)
-            
-        except Exception as e:
-            failed += 1
-            # If bot was removed or doesn't have permissions
-            # Optionally deactivate the group
-            if "bot was kicked" in str(e).lower() or "chat not found" in str(e).lower():
-                await db.deactivate_group(group.chat_id)
-            continue
+        f"Jami: {len(recipients)} ta guruh/kanal\n"
+        f"Segment: <code>{format_segment(segment)}</code>\n\n"
+        f"⏳ Iltimos kuting...",
+        reply_markup=get_broadcast_progress_keyboard(job.id)
+    )
     
+    # Runs in background, results are reported by editing the message above
+    broadcast_manager.start(job.id)
+    
+    await state.clear()
+    await callback.answer("✅ Broadcast boshlandi!")
+
+
+@router.callback_query(F.data == "broadcast_template")
+async def ask_broadcast_template(callback: CallbackQuery, state: FSMContext):
+    """Shaxsiy xabar shablonini so'rash"""
+    await state.set_state(BroadcastStates.waiting_for_template)
+    
+    fields = ", ".join(f"<code>{{{field}}}</code>" for field in TEMPLATE_FIELDS)
     await callback.message.edit_text(
-        f"✅ <b>Broadcast yakunlandi!</b>\n\n"
-        f"💬 Target: <b>Groups/Channels</b>\n\n"
-        f"📊 Natijalar:\n"
-        f"├ Muvaffaqiyatli: <b>{success}</b>\n"
-        f"├ Muvaffaqiyatsiz: <b>{failed}</b>\n"
-        f"└ Jami: <b>{len(active_groups)}</b>\n\n"
-        f"✨ Barcha guruh va kanallarga yetkazildi!"
+        "📝 <b>Shaxsiy xabar</b>\n\n"
+        "Har bir userga o'z ma'lumotlari bilan yuboriladigan matnni kiriting:\n\n"
+        "<code>Salom {preferred_name}, balansingiz {coins} KiberCoin</code>\n\n"
+        f"Maydonlar: {fields}\n\n"
+        "❌ Bekor qilish uchun /cancel yuboring"
     )
+    await callback.answer()
+
+
+@router.message(BroadcastStates.waiting_for_template, F.text)
+async def receive_broadcast_template(message: Message, state: FSMContext, db: Database):
+    """Shablonni tekshirish va namunasini ko'rsatish"""
+    try:
+        template = MessageTemplate(message.html_text)
+    except ValueError as e:
+        await message.answer(f"❌ Shablonda xatolik: {e}\n\nQaytadan kiriting:", parse_mode=None)
+        return
+    
+    # Preview rendered with the admin's own data
+    admin = await db.get_user(message.from_user.id)
+    preview = template.render({field: getattr(admin, field) for field in template.fields} if admin else {})
     
+    await state.update_data(
+        message_id=message.message_id,
+        message_ids=None,
+        chat_id=message.chat.id,
+        template=template.text
+    )
+    await state.set_state(BroadcastStates.waiting_for_content)
+    
+    await message.answer(
+        f"✅ Shablon qabul qilindi!\n\n"
+        f"Namuna:\n\n{preview}\n\n"
+        f"Userlarga yuborilsinmi?",
+        reply_markup=get_broadcast_segment_confirm_keyboard(BroadcastTarget.USERS.value)
+    )
+
+
+@router.callback_query(F.data == "broadcast_schedule")
+async def ask_broadcast_schedule(callback: CallbackQuery, state: FSMContext):
+    """Broadcast vaqtini so'rash"""
+    await state.set_state(BroadcastStates.waiting_for_schedule)
+    
+    await callback.message.edit_text(
+        "⏰ <b>Broadcastni rejalashtirish</b>\n\n"
+        "Yuborish vaqtini kiriting (Toshkent vaqti):\n\n"
+        "📅 <code>25.12.2025 09:00</code>\n"
+        "🕒 <code>21:30</code> - bugun yoki ertaga\n\n"
+        "Yukni kamaytirish uchun yuborishni bir necha daqiqaga taqsimlash mumkin:\n"
+        "<code>25.12.2025 09:00 60</code> - 60 daqiqa davomida\n\n"
+        "❌ Bekor qilish uchun /cancel yuboring"
+    )
+    await callback.answer()
+
+
+@router.message(BroadcastStates.waiting_for_schedule, F.text)
+async def receive_broadcast_schedule(message: Message, state: FSMContext):
+    """Broadcast vaqtini qabul qilish"""
+    schedule = parse_schedule(message.text.strip())
+    
+    if not schedule:
+        await message.answer(
+            "❌ Noto'g'ri vaqt!\n\n"
+            "Kelajakdagi vaqtni <code>25.12.2025 09:00</code> yoki <code>21:30</code> "
+            "ko'rinishida kiriting."
+        )
+        return
+    
+    scheduled_at, spread_minutes = schedule
+    await state.update_data(
+        scheduled_at=scheduled_at.isoformat(),
+        spread_minutes=spread_minutes
+    )
+    await state.set_state(BroadcastStates.waiting_for_content)
+    
+    spread_text = f"\n⏳ Taqsimlash: {spread_minutes} daqiqa" if spread_minutes else ""
+    await message.answer(
+        f"✅ Vaqt qabul qilindi: <b>{format_local_time(scheduled_at)}</b>"
+        f"{spread_text}\n\n"
+        f"Kimga yuborish kerak?",
+        reply_markup=get_broadcast_target_keyboard(with_schedule=False)
+    )
+
+
+@router.callback_query(F.data == "broadcast_segment")
+async def ask_broadcast_segment(callback: CallbackQuery, state: FSMContext):
+    """Broadcast auditoriyasini so'rash"""
+    await state.set_state(BroadcastStates.waiting_for_segment)
+    
+    await callback.message.edit_text(
+        "🎯 <b>Auditoriya segmenti</b>\n\n"
+        "Userlar uchun:\n"
+        "<code>users lang=uz coins=10-100 date=01.01.2025-31.01.2025 ref=KOD</code>\n\n"
+        "Guruhlar uchun:\n"
+        "<code>groups type=supergroup admin=yes</code>\n\n"
+        "Barcha filtrlar ixtiyoriy, <code>coins=100-</code> - 100 va undan ko'p.\n\n"
+        "❌ Bekor qilish uchun /cancel yuboring"
+    )
+    await callback.answer()
+
+
+@router.message(BroadcastStates.waiting_for_segment, F.text)
+async def receive_broadcast_segment(message: Message, state: FSMContext, db: Database):
+    """Segmentni qabul qilish va auditoriya hajmini ko'rsatish"""
+    parsed = parse_segment(message.text.strip())
+    
+    if not parsed:
+        await message.answer(
+            "❌ Noto'g'ri segment!\n\n"
+            "Masalan: <code>users lang=uz coins=10-100</code> yoki "
+            "<code>groups type=channel</code>"
+        )
+        return
+    
+    target, segment, referral_code = parsed
+    if referral_code:
+        referrer = await db.get_user_by_referral_code(referral_code)
+        if not referrer:
+            await message.answer("❌ Bunday referal kodli user topilmadi!")
+            return
+        segment.referred_by_id = referrer.id
+    
+    # Cheap COUNT with the same filters the broadcast will use
+    total = await db.count_recipients(target, segment)
+    
+    await state.update_data(segment=segment.to_json(), segment_target=target.value)
+    await state.set_state(BroadcastStates.waiting_for_content)
+    
+    target_text = "ta user" if target == BroadcastTarget.USERS else "ta guruh/kanal"
+    await message.answer(
+        f"🎯 Segment qabul qilindi!\n\n"
+        f"Filtr: <code>{format_segment(segment)}</code>\n"
+        f"Auditoriya: <b>{total}</b> {target_text}\n\n"
+        f"Yuborilsinmi?",
+        reply_markup=get_broadcast_segment_confirm_keyboard(target.value)
+    )
+
+
+@router.callback_query(F.data.startswith("broadcast_stop_"))
+async def stop_broadcast(callback: CallbackQuery, broadcast_manager: BroadcastManager):
+    """Ketayotgan broadcastni to'xtatish"""
+    job_id = int(callback.data.split("_")[-1])
+    if await broadcast_manager.cancel(job_id):
+        await callback.answer("⏹ Broadcast to'xtatildi")
+    else:
+        await callback.answer("Broadcast allaqachon tugagan", show_alert=True)
+
+
+@router.callback_query(F.data.startswith("broadcast_delete_confirm_"))
+async def confirm_delete_broadcast(callback: CallbackQuery, broadcast_manager: BroadcastManager):
+    """Yuborilgan broadcastni barcha chatlardan o'chirish"""
+    job_id = int(callback.data.split("_")[-1])
+    await callback.message.edit_text("🗑 O'chirilmoqda...\n\n⏳ Iltimos kuting...")
+    if await broadcast_manager.delete(job_id, callback.message.chat.id, callback.message.message_id):
+        await callback.answer("🗑 O'chirish boshlandi")
+    else:
+        await callback.message.edit_text("❌ Bu broadcastni hozir o'chirib bo'lmaydi.")
+        await callback.answer()
+
+
+@router.callback_query(F.data.startswith("broadcast_delete_"))
+async def ask_delete_broadcast(callback: CallbackQuery):
+    """Broadcastni o'chirishni tasdiqlash"""
+    job_id = int(callback.data.split("_")[-1])
+    await callback.message.edit_text(
+        "🗑 <b>Broadcastni o'chirish</b>\n\n"
+        "Xabar barcha user va guruhlardan o'chiriladi.\n"
+        "⚠️ Telegram 48 soatdan eski xabarlarni o'chirishga ruxsat bermaydi.\n\n"
+        "Davom etilsinmi?",
+        reply_markup=get_broadcast_delete_confirm_keyboard(job_id)
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("broadcast_edit_"))
+async def ask_edit_broadcast(callback: CallbackQuery, state: FSMContext):
+    """Broadcastning yangi matnini so'rash"""
+    job_id = int(callback.data.split("_")[-1])
+    await state.update_data(edit_job_id=job_id)
+    await state.set_state(BroadcastStates.waiting_for_edit)
+    
+    await callback.message.answer(
+        "✏️ <b>Broadcastni tahrirlash</b>\n\n"
+        "Yangi matnni yuboring. Media xabarlarda izoh (caption) almashtiriladi.\n\n"
+        "❌ Bekor qilish uchun /cancel yuboring"
+    )
+    await callback.answer()
+
+
+@router.message(BroadcastStates.waiting_for_edit, F.text)
+async def receive_broadcast_edit(message: Message, state: FSMContext, broadcast_manager: BroadcastManager):
+    """Yangi matnni barcha chatlarga qo'llash"""
+    data = await state.get_data()
+    job_id = data.get("edit_job_id")
     await state.clear()
-    await callback.answer("✅ Yuborildi!")
+    
+    status = await message.answer("✏️ Tahrirlanmoqda...\n\n⏳ Iltimos kuting...")
+    if not job_id or not await broadcast_manager.edit(job_id, message.html_text, status.chat.id, status.message_id):
+        await status.edit_text("❌ Bu broadcastni hozir tahrirlab bo'lmaydi.")
 
 
 @router.callback_query(F.data == "broadcast_cancel")
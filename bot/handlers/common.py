@@ -0,0 +1,21 @@
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+from aiogram.fsm.context import FSMContext
+
+# Handlers open to every user; not behind AdminMiddleware
+router = Router()
+
+
+@router.message(Command("cancel"))
+async def cancel_operation(message: Message, state: FSMContext):
+    """Joriy operatsiyani bekor qilish"""
+    current_state = await state.get_state()
+    if current_state is None:
+        return
+    
+    await state.clear()
+    await message.answer(
+        "❌ Operatsiya bekor qilindi!",
+        parse_mode="HTML"
+    )
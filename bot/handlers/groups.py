@@ -40,6 +40,14 @@ def get_bot_permissions(member) -> str:
     return json.dumps(permissions, ensure_ascii=False)
 
 
+@router.my_chat_member(F.chat.type == "private")
+async def bot_status_in_private_chat(event: ChatMemberUpdated, db: Database):
+    """User botni bloklaganda yoki blokdan chiqarganda"""
+    # "kicked" - user blocked the bot, "member" - unblocked / restarted it
+    is_reachable = event.new_chat_member.status not in ["kicked", "left"]
+    await db.set_user_reachable(event.chat.id, is_reachable)
+
+
 @router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=MEMBER | ADMINISTRATOR))
 async def bot_added_to_chat(event: ChatMemberUpdated, db: Database):
     """Bot guruhga qo'shilganda yoki admin qilinganda"""
@@ -123,10 +131,13 @@ async def group_message_handler(message: Message, db: Database):
     """Guruhda xabar yuborilganda guruh ma'lumotlarini yangilash"""
     chat = message.chat
     
-    # Check if group exists
-    group = await db.get_group(chat.id)
+    # Check if group exists; the database is asked only about chats not seen yet
+    known = db.known_groups.get(chat.id)
+    if known is None:
+        group = await db.get_group(chat.id)
+        known = (group.title, group.is_active) if group else None
     
-    if not group:
+    if not known:
         # If group doesn't exist, create it
         # Get bot member info
         try:
@@ -160,10 +171,9 @@ async def group_message_handler(message: Message, db: Database):
             bot_permissions=permissions,
             member_count=member_count
         )
-    else:
+    elif known[0] != chat.title:
         # Update title if changed
-        if group.title != chat.title:
-            await db.update_group(chat_id=chat.id, title=chat.title)
+        await db.update_group(chat_id=chat.id, title=chat.title)
 
 
 @router.message(F.chat.type == "channel")
@@ -171,8 +181,8 @@ async def channel_message_handler(message: Message, db: Database):
     """Kanalda xabar yuborilganda kanal ma'lumotlarini yangilash"""
     chat = message.chat
     
-    # Check if channel exists
-    channel = await db.get_group(chat.id)
+    # Check if channel exists; the database is asked only about chats not seen yet
+    channel = chat.id in db.known_groups or await db.get_group(chat.id)
     
     if not channel:
         # Get member count
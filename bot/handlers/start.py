@@ -5,8 +5,8 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, ReplyKeyboardRemove
 from aiogram.filters.command import CommandObject
 from bot.database.database import Database
-from bot.database.models import TransactionType
 from bot.keyboards.reply import get_phone_keyboard
+from bot.services.outbound import Priority, priority
 
 router = Router()
 
@@ -95,54 +95,37 @@ async def process_name(message: Message, state: FSMContext, db: Database):
     preferred_name = message.text.strip()
     telegram_id = message.from_user.id
 
-    # Update user's name and mark as registered
-    user = await db.update_user_name(telegram_id, preferred_name)
-    
-    # Generate referral code for new user
-    await db.set_referral_code(user.id)
-
     # Check if user came from referral link
     state_data = await state.get_data()
     referral_code = state_data.get('referral_code')
-    
-    if referral_code:
-        referrer = await db.get_user_by_referral_code(referral_code)
-        if referrer and referrer.id != user.id:
-            # Update referred_by
-            async with db.session_maker() as session:
-                from sqlalchemy import select
-                from bot.database.models import User
-                result = await session.execute(
-                    select(User).where(User.id == user.id)
-                )
-                user_obj = result.scalar_one_or_none()
-                if user_obj:
-                    user_obj.referred_by_id = referrer.id
-                    await session.commit()
-            
-            # Give 7 KiberCoins to referrer
-            await db.add_coins(
-                user_id=referrer.id,
-                amount=7,
-                transaction_type=TransactionType.REFERRAL_BONUS,
-                description=f"Referal bonus: {preferred_name} botga qo'shildi",
-                related_user_id=user.id
-            )
-            
-            # Notify referrer
-            try:
-                from aiogram import Bot
-                from bot.config import BOT_TOKEN
-                bot = Bot(token=BOT_TOKEN)
-                await bot.send_message(
-                    referrer.telegram_id,
+
+    # Name, referral code, referrer link and 7 KiberCoin bonus in one transaction
+    user = message.from_user
+    result = await db.complete_registration(
+        telegram_id=telegram_id,
+        preferred_name=preferred_name,
+        referral_code=referral_code,
+        referral_bonus=7,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        language_code=user.language_code
+    )
+
+    if result.referrer:
+        # Notify referrer through the shared bot session and its rate limits
+        try:
+            with priority(Priority.NOTIFICATION):
+                await message.bot.send_message(
+                    result.referrer.telegram_id,
                     f"🎉 Tabriklaymiz!\n\n"
                     f"Sizning referal linkingiz orqali {preferred_name} botga qo'shildi!\n\n"
                     f"💰 +7 KiberCoin\n"
-                    f"Jami balansingiz: {referrer.coins + 7} KiberCoin"
+                    f"Jami balansingiz: {result.referrer_balance} KiberCoin",
+                    parse_mode=None
                 )
-            except:
-                pass
+        except:
+            pass
 
     # Congratulate user on successful registration
     await message.answer(
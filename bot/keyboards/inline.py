@@ -38,66 +38,161 @@ def get_back_button() -> InlineKeyboardMarkup:
     return keyboard
 
 
-def get_users_navigation(page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
-    """Users ro'yxati uchun navigatsiya"""
+USER_FILTER_BUTTONS = (
+    ("all", "Hammasi"),
+    ("reg", "✅ Ro'yxatdan o'tgan"),
+    ("adm", "👑 Adminlar"),
+    ("coin", "💰 Coinli"),
+)
+
+GROUP_FILTER_BUTTONS = (
+    ("all", "Hammasi"),
+    ("act", "✅ Aktiv"),
+    ("grp", "💬 Guruh"),
+    ("sgrp", "🔷 Superguruh"),
+    ("chan", "📢 Kanal"),
+)
+
+
+def _list_navigation(
+    prefix: str,
+    filter_buttons: tuple,
+    page: int,
+    total_pages: int,
+    list_filter: str,
+    first_id: int,
+    last_id: int
+) -> InlineKeyboardMarkup:
+    """Keyset ro'yxat navigatsiyasi: <prefix>_page_<filter>_<page>_<n|p>_<cursor>"""
     buttons = []
     
     # Navigation buttons
     nav_row = []
     if page > 1:
-        nav_row.append(InlineKeyboardButton(text="◀️", callback_data=f"users_page_{page-1}"))
+        nav_row.append(InlineKeyboardButton(
+            text="◀️", callback_data=f"{prefix}_page_{list_filter}_{page-1}_p_{first_id}"
+        ))
     
-    nav_row.append(InlineKeyboardButton(text=f"{page}/{total_pages}", callback_data="users_current"))
+    nav_row.append(InlineKeyboardButton(text=f"{page}/{total_pages}", callback_data=f"{prefix}_current"))
     
     if page < total_pages:
-        nav_row.append(InlineKeyboardButton(text="▶️", callback_data=f"users_page_{page+1}"))
+        nav_row.append(InlineKeyboardButton(
+            text="▶️", callback_data=f"{prefix}_page_{list_filter}_{page+1}_n_{last_id}"
+        ))
     
     if nav_row:
         buttons.append(nav_row)
     
+    # Filter buttons, the current one is marked
+    filter_row = []
+    for key, text in filter_buttons:
+        if key == list_filter:
+            text = f"• {text} •"
+        filter_row.append(InlineKeyboardButton(text=text, callback_data=f"{prefix}_page_{key}_1_n_0"))
+    buttons.extend(filter_row[i:i + 3] for i in range(0, len(filter_row), 3))
+    
     # Back button
-    buttons.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data="users_back")])
+    buttons.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data=f"{prefix}_back")])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def get_groups_navigation(page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
+def get_users_navigation(
+    page: int = 1,
+    total_pages: int = 1,
+    list_filter: str = "all",
+    first_id: int = 0,
+    last_id: int = 0
+) -> InlineKeyboardMarkup:
+    """Users ro'yxati uchun navigatsiya"""
+    return _list_navigation("users", USER_FILTER_BUTTONS, page, total_pages, list_filter, first_id, last_id)
+
+
+def get_groups_navigation(
+    page: int = 1,
+    total_pages: int = 1,
+    list_filter: str = "all",
+    first_id: int = 0,
+    last_id: int = 0
+) -> InlineKeyboardMarkup:
     """Groups ro'yxati uchun navigatsiya"""
-    buttons = []
-    
-    # Navigation buttons
-    nav_row = []
-    if page > 1:
-        nav_row.append(InlineKeyboardButton(text="◀️", callback_data=f"groups_page_{page-1}"))
-    
-    nav_row.append(InlineKeyboardButton(text=f"{page}/{total_pages}", callback_data="groups_current"))
-    
-    if page < total_pages:
-        nav_row.append(InlineKeyboardButton(text="▶️", callback_data=f"groups_page_{page+1}"))
-    
-    if nav_row:
-        buttons.append(nav_row)
-    
-    # Back button
-    buttons.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data="groups_back")])
-    
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+    return _list_navigation("groups", GROUP_FILTER_BUTTONS, page, total_pages, list_filter, first_id, last_id)
+
 
+def get_broadcast_start_keyboard() -> InlineKeyboardMarkup:
+    """Broadcast turini tanlash"""
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="📝 Shaxsiy xabar (shablon)", callback_data="broadcast_template")],
+            [InlineKeyboardButton(text="❌ Bekor qilish", callback_data="broadcast_cancel")]
+        ]
+    )
+    return keyboard
 
-def get_broadcast_target_keyboard() -> InlineKeyboardMarkup:
+
+def get_broadcast_target_keyboard(with_schedule: bool = True) -> InlineKeyboardMarkup:
     """Broadcast yuborish uchun target tanlash"""
+    buttons = [
+        [
+            InlineKeyboardButton(text="👥 Users", callback_data="broadcast_users"),
+            InlineKeyboardButton(text="💬 Groups", callback_data="broadcast_groups")
+        ]
+    ]
+    extra = [InlineKeyboardButton(text="🎯 Segment", callback_data="broadcast_segment")]
+    if with_schedule:
+        extra.append(InlineKeyboardButton(text="⏰ Rejalashtirish", callback_data="broadcast_schedule"))
+    buttons.append(extra)
+    buttons.append([InlineKeyboardButton(text="❌ Bekor qilish", callback_data="broadcast_cancel")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_broadcast_segment_confirm_keyboard(target: str) -> InlineKeyboardMarkup:
+    """Segmentga yuborishni tasdiqlash"""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
-            [
-                InlineKeyboardButton(text="👥 Users", callback_data="broadcast_users"),
-                InlineKeyboardButton(text="💬 Groups", callback_data="broadcast_groups")
-            ],
+            [InlineKeyboardButton(text="✅ Yuborish", callback_data=f"broadcast_{target}")],
             [InlineKeyboardButton(text="❌ Bekor qilish", callback_data="broadcast_cancel")]
         ]
     )
     return keyboard
 
 
+def get_broadcast_progress_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    """Ketayotgan broadcastni to'xtatish tugmasi"""
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="⏹ To'xtatish", callback_data=f"broadcast_stop_{job_id}")]
+        ]
+    )
+    return keyboard
+
+
+def get_broadcast_manage_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    """Yuborilgan broadcastni tahrirlash yoki o'chirish"""
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✏️ Tahrirlash", callback_data=f"broadcast_edit_{job_id}"),
+                InlineKeyboardButton(text="🗑 O'chirish", callback_data=f"broadcast_delete_{job_id}")
+            ]
+        ]
+    )
+    return keyboard
+
+
+def get_broadcast_delete_confirm_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    """Broadcastni o'chirishni tasdiqlash"""
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✅ Ha, o'chirish", callback_data=f"broadcast_delete_confirm_{job_id}"),
+                InlineKeyboardButton(text="❌ Yo'q", callback_data="broadcast_cancel")
+            ]
+        ]
+    )
+    return keyboard
+
+
 def get_coins_menu() -> InlineKeyboardMarkup:
     """KiberCoin menu for users"""
     keyboard = InlineKeyboardMarkup(
@@ -125,23 +220,51 @@ def get_coin_management_menu() -> InlineKeyboardMarkup:
     return keyboard
 
 
-def get_transactions_navigation(page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
-    """Transactions list navigation"""
+TRANSACTION_FILTER_BUTTONS = (
+    # (position in the filter code, value, text)
+    ((0, "a", "Hammasi"), (0, "r", "🎁 Referal"), (0, "p", "➕ Qo'shish"), (0, "m", "➖ Ayirish")),
+    ((1, "a", "Barcha adminlar"), (1, "s", "👤 Mening")),
+    ((2, "a", "Butun vaqt"), (2, "d", "Bugun"), (2, "w", "7 kun"), (2, "m", "30 kun")),
+)
+
+
+def get_transactions_navigation(
+    page: int = 1,
+    total_pages: int = 1,
+    tx_filter: str = "aaa",
+    first_cursor: str = "0_0",
+    last_cursor: str = "0_0"
+) -> InlineKeyboardMarkup:
+    """Transactions list navigation: transactions_page_<filter>_<page>_<n|p>_<created_us>_<id>"""
     buttons = []
     
     # Navigation buttons
     nav_row = []
     if page > 1:
-        nav_row.append(InlineKeyboardButton(text="◀️", callback_data=f"transactions_page_{page-1}"))
+        nav_row.append(InlineKeyboardButton(
+            text="◀️", callback_data=f"transactions_page_{tx_filter}_{page-1}_p_{first_cursor}"
+        ))
     
     nav_row.append(InlineKeyboardButton(text=f"{page}/{total_pages}", callback_data="transactions_current"))
     
     if page < total_pages:
-        nav_row.append(InlineKeyboardButton(text="▶️", callback_data=f"transactions_page_{page+1}"))
+        nav_row.append(InlineKeyboardButton(
+            text="▶️", callback_data=f"transactions_page_{tx_filter}_{page+1}_n_{last_cursor}"
+        ))
     
     if nav_row:
         buttons.append(nav_row)
     
+    # Filter buttons: type, admin, period; the current ones are marked
+    for row in TRANSACTION_FILTER_BUTTONS:
+        filter_row = []
+        for position, value, text in row:
+            code = tx_filter[:position] + value + tx_filter[position + 1:]
+            if tx_filter[position] == value:
+                text = f"• {text} •"
+            filter_row.append(InlineKeyboardButton(text=text, callback_data=f"transactions_page_{code}_1_n_0_0"))
+        buttons.append(filter_row)
+    
     # Back button
     buttons.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data="transactions_back")])
     
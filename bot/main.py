@@ -3,9 +3,23 @@ import logging
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from bot.config import BOT_TOKEN
+from bot.config import (
+    BOT_TOKEN,
+    BROADCAST_WORKERS,
+    BROADCAST_GLOBAL_RATE,
+    BROADCAST_PRIVATE_INTERVAL,
+    BROADCAST_GROUP_INTERVAL,
+    BROADCAST_MAX_RETRIES,
+    OUTBOUND_CHAT_BURST,
+    ADMIN_IDS_MAX_AGE
+)
 from bot.database.database import Database
-from bot.handlers import start, groups, admin, broadcast, coins
+from bot.middlewares.admin import AdminMiddleware
+from bot.services.broadcaster import Broadcaster
+from bot.services.broadcast_jobs import BroadcastManager
+from bot.services.outbound import OutboundScheduler
+from bot.services.rate_limiter import RateLimiter
+from bot.handlers import start, groups, common, admin, broadcast, coins
 
 # Configure logging
 logging.basicConfig(
@@ -40,22 +54,57 @@ async def main():
         token=BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    
+    # Every outgoing request shares one rate limiter for the bot token;
+    # handler replies go ahead of broadcast traffic
+    limiter = RateLimiter(
+        global_rate=BROADCAST_GLOBAL_RATE,
+        private_interval=BROADCAST_PRIVATE_INTERVAL,
+        group_interval=BROADCAST_GROUP_INTERVAL,
+        chat_burst=OUTBOUND_CHAT_BURST
+    )
+    bot.session.middleware(OutboundScheduler(limiter))
     dp = Dispatcher()
 
     # Register routers
     dp.include_router(start.router)
     dp.include_router(groups.router)
+    dp.include_router(common.router)
     dp.include_router(admin.router)
     dp.include_router(broadcast.router)
     dp.include_router(coins.router)
 
-    # Inject database into handlers
+    # Every admin panel and broadcast handler requires the admin role
+    admin_middleware = AdminMiddleware(max_age=ADMIN_IDS_MAX_AGE)
+    for router in (admin.router, broadcast.router):
+        router.message.middleware(admin_middleware)
+        router.callback_query.middleware(admin_middleware)
+
+    broadcaster = Broadcaster(workers=BROADCAST_WORKERS, max_retries=BROADCAST_MAX_RETRIES)
+    broadcast_manager = BroadcastManager(bot, db, broadcaster)
+
+    # Inject database and broadcast manager into handlers
     dp["db"] = db
+    dp["broadcast_manager"] = broadcast_manager
 
     try:
+        # Group messages check titles against this map instead of the database
+        known = await db.load_known_groups()
+        logger.info(f"Loaded {known} known group(s)")
+
+        # Continue broadcasts interrupted by a restart
+        resumed = await broadcast_manager.resume()
+        if resumed:
+            logger.info(f"Resumed {resumed} broadcast job(s)")
+        broadcast_manager.start_scheduler()
+
         logger.info("Bot started successfully!")
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        await broadcast_manager.shutdown()
+        # Checkout waits over the whole run, for sizing DB_POOL_SIZE
+        logger.info(f"Database pool: {db.get_pool_stats()}")
+        logger.info(f"User cache: {db.user_cache.stats()}")
         await db.close()
         await bot.session.close()
 
@@ -0,0 +1,35 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery, User
+from bot.database.database import Database
+
+
+class AdminMiddleware(BaseMiddleware):
+    """Let only admins reach the handlers of a router.
+
+    Registered as an inner middleware, so it runs only for updates a handler
+    of the router matched. The check is a lookup in the admin id set that
+    Database caches for max_age seconds.
+    """
+
+    def __init__(self, max_age: float = 60.0):
+        self.max_age = max_age
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        db: Database = data["db"]
+        user: User = data.get("event_from_user")
+        if user and user.id in await db.get_admin_ids(self.max_age):
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            await event.answer("❌ Sizda admin huquqi yo'q!", show_alert=True)
+        elif isinstance(event, Message):
+            await event.answer(
+                "❌ Kechirasiz, sizda admin huquqi yo'q!\n\n"
+                "Bu buyruq faqat adminlar uchun."
+            )
@@ -0,0 +1,487 @@
+import asyncio
+import logging
+import time
+from array import array
+from datetime import datetime
+from typing import Callable, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramMigrateToChat
+from bot.database.database import Database
+from bot.database.models import BroadcastJob, BroadcastTarget, BroadcastStatus, DeliveryStatus
+from bot.database.segments import Segment
+from bot.keyboards.inline import get_broadcast_progress_keyboard, get_broadcast_manage_keyboard
+from bot.services.broadcaster import Broadcaster, is_permanent_error
+from bot.services.outbound import Priority, outbound_priority
+from bot.services.templates import MessageTemplate
+
+logger = logging.getLogger(__name__)
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as H:MM:SS or M:SS"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class BroadcastManager:
+    """Runs persisted broadcast jobs as detached background tasks"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        db: Database,
+        broadcaster: Broadcaster,
+        checkpoint_size: int = 100,
+        checkpoint_interval: float = 1.0,
+        progress_interval: float = 20.0,
+        scheduler_interval: float = 30.0
+    ):
+        self.bot = bot
+        self.db = db
+        self.broadcaster = broadcaster
+        self.checkpoint_size = checkpoint_size
+        self.checkpoint_interval = checkpoint_interval
+        self.progress_interval = progress_interval
+        self.scheduler_interval = scheduler_interval
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._cancelled: set[int] = set()
+        self._scheduler: Optional[asyncio.Task] = None
+        # Delete/edit runs over already delivered jobs, by job id
+        self._fan_outs: dict[int, asyncio.Task] = {}
+
+    def start(self, job_id: int) -> None:
+        """Run job in background; the caller does not wait for it"""
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._finished(job_id))
+
+    def _finished(self, job_id: int) -> None:
+        self._tasks.pop(job_id, None)
+        self._cancelled.discard(job_id)
+
+    async def resume(self) -> int:
+        """Restart jobs that were interrupted by a restart or deploy"""
+        jobs = await self.db.get_unfinished_broadcast_jobs()
+        for job in jobs:
+            logger.info(f"Resuming broadcast job {job.id} ({job.sent + job.failed}/{job.total} done)")
+            self.start(job.id)
+        return len(jobs)
+
+    async def cancel(self, job_id: int) -> bool:
+        """Stop a broadcast; in-flight workers are cancelled immediately"""
+        job = await self.db.get_broadcast_job(job_id)
+        if not job or job.status not in (
+            BroadcastStatus.SCHEDULED, BroadcastStatus.PENDING, BroadcastStatus.RUNNING
+        ):
+            return False
+
+        if not await self.db.set_broadcast_job_status(
+            job_id,
+            BroadcastStatus.CANCELLED,
+            from_statuses=(BroadcastStatus.SCHEDULED, BroadcastStatus.PENDING, BroadcastStatus.RUNNING)
+        ):
+            # Finished meanwhile
+            return False
+        task = self._tasks.get(job_id)
+        if task:
+            # The job task flushes its checkpoint and reports the cancellation
+            self._cancelled.add(job_id)
+            task.cancel()
+        else:
+            await self._report(job_id)
+        return True
+
+    def start_scheduler(self) -> None:
+        """Fire scheduled jobs on time, including ones that came due while the bot was down"""
+        if self._scheduler is None:
+            self._scheduler = asyncio.create_task(self._scheduler_loop())
+
+    async def _scheduler_loop(self) -> None:
+        while True:
+            try:
+                for job in await self.db.get_due_broadcast_jobs(datetime.utcnow()):
+                    await self._fire(job)
+            except Exception as e:
+                logger.error(f"Broadcast scheduler error: {e}")
+            await asyncio.sleep(self.scheduler_interval)
+
+    async def _select_recipients(self, job: BroadcastJob) -> array:
+        segment = Segment.from_json(job.segment)
+        if job.target == BroadcastTarget.USERS:
+            return await self.db.get_user_chat_ids(segment=segment)
+        return await self.db.get_group_chat_ids(active_only=True, segment=segment)
+
+    async def _fire(self, job: BroadcastJob) -> None:
+        """Pick recipients of a scheduled job now and start it"""
+        recipients = await self._select_recipients(job)
+        if await self.db.activate_scheduled_broadcast(job.id, recipients):
+            logger.info(f"Scheduled broadcast job {job.id} started ({len(recipients)} recipients)")
+            self.start(job.id)
+
+    async def shutdown(self) -> None:
+        """Stop running jobs; their progress is kept and resumed on next start"""
+        if self._scheduler:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+            self._scheduler = None
+        tasks = list(self._tasks.values()) + list(self._fan_outs.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def make_sender(self, job: BroadcastJob, render: Optional[Callable[[int], str]] = None):
+        """Build the send(chat_id) callable that delivers the job payload.
+
+        send returns ids of the copies in the recipient chat. Templated jobs
+        need render(chat_id) returning the personalized text.
+        """
+        async def send(chat_id: int) -> list[int]:
+            if render:
+                message = await self.bot.send_message(chat_id=chat_id, text=render(chat_id))
+                return [message.message_id]
+            if job.message_ids:
+                # Whole album in one request per recipient
+                copies = await self.bot.copy_messages(
+                    chat_id=chat_id,
+                    from_chat_id=job.from_chat_id,
+                    message_ids=job.message_ids
+                )
+                return [copy.message_id for copy in copies]
+            # Copy message (special forward without "Forwarded from")
+            copy = await self.bot.copy_message(
+                chat_id=chat_id,
+                from_chat_id=job.from_chat_id,
+                message_id=job.message_id
+            )
+            return [copy.message_id]
+
+        return send
+
+    async def delete(self, job_id: int, status_chat_id: int, status_message_id: int) -> bool:
+        """Delete a finished broadcast from every chat it was delivered to"""
+        async def delete_copies(chat_id: int, message_ids: list[int]):
+            await self.bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+
+        return await self._start_fan_out(
+            job_id, delete_copies, "🗑 <b>Broadcast o'chirildi!</b>", status_chat_id, status_message_id
+        )
+
+    async def edit(self, job_id: int, text: str, status_chat_id: int, status_message_id: int) -> bool:
+        """Replace text (or caption of media) of a finished broadcast in every chat"""
+        use_caption = False
+
+        async def edit_copies(chat_id: int, message_ids: list[int]):
+            nonlocal use_caption
+            # Album caption lives on its first message
+            message_id = message_ids[0]
+            try:
+                if not use_caption:
+                    try:
+                        await self.bot.edit_message_text(text, chat_id=chat_id, message_id=message_id)
+                        return
+                    except TelegramBadRequest as e:
+                        if "no text in the message" not in e.message.lower():
+                            raise
+                        # Media broadcast, switch every worker to captions
+                        use_caption = True
+                await self.bot.edit_message_caption(chat_id=chat_id, message_id=message_id, caption=text)
+            except TelegramBadRequest as e:
+                if "message is not modified" not in e.message.lower():
+                    raise
+
+        return await self._start_fan_out(
+            job_id, edit_copies, "✏️ <b>Broadcast tahrirlandi!</b>", status_chat_id, status_message_id
+        )
+
+    async def _start_fan_out(self, job_id: int, action, title: str, status_chat_id: int, status_message_id: int) -> bool:
+        job = await self.db.get_broadcast_job(job_id)
+        if not job or job.status not in (
+            BroadcastStatus.COMPLETED, BroadcastStatus.CANCELLED, BroadcastStatus.FAILED
+        ):
+            return False
+        if job_id in self._fan_outs:
+            return False
+        task = asyncio.create_task(self._fan_out(job_id, action, title, status_chat_id, status_message_id))
+        self._fan_outs[job_id] = task
+        task.add_done_callback(lambda _: self._fan_outs.pop(job_id, None))
+        return True
+
+    async def _fan_out(self, job_id: int, action, title: str, status_chat_id: int, status_message_id: int) -> None:
+        """Apply action(chat_id, message_ids) to every delivered copy through the rate-limited pool"""
+        outbound_priority.set(Priority.BULK)
+        done = 0
+        failed = 0
+
+        def on_result(chat_id: int, error: Optional[Exception]):
+            nonlocal done, failed
+            if error is None:
+                done += 1
+            else:
+                failed += 1
+
+        async for batch in self.db.iter_delivered_messages(job_id):
+            copies = dict(batch)
+
+            async def send(chat_id: int):
+                await action(chat_id, copies[chat_id])
+
+            await self.broadcaster.run(copies.keys(), send, on_result=on_result)
+
+        logger.info(f"Broadcast job {job_id} fan-out finished: {done} done, {failed} failed")
+        try:
+            await self.bot.edit_message_text(
+                f"{title}\n\n"
+                f"├ Muvaffaqiyatli: <b>{done}</b>\n"
+                f"└ Muvaffaqiyatsiz: <b>{failed}</b>",
+                chat_id=status_chat_id,
+                message_id=status_message_id
+            )
+        except Exception as e:
+            logger.warning(f"Could not report fan-out of broadcast job {job_id}: {e}")
+
+    async def _mark_unreachable(self, job: BroadcastJob, chat_ids: list[int]) -> None:
+        """Write back chats that can never receive messages, one UPDATE per batch"""
+        if job.target == BroadcastTarget.GROUPS:
+            await self.db.deactivate_groups(chat_ids)
+        else:
+            await self.db.mark_users_unreachable(chat_ids)
+
+    async def _run(self, job_id: int) -> None:
+        # Everything this task sends yields to interactive replies
+        outbound_priority.set(Priority.BULK)
+        job = await self.db.get_broadcast_job(job_id)
+        if not job:
+            return
+
+        # Conditional, so a cancel committed meanwhile is not overwritten
+        if not await self.db.set_broadcast_job_status(
+            job_id, BroadcastStatus.RUNNING, from_statuses=(BroadcastStatus.PENDING, BroadcastStatus.RUNNING)
+        ):
+            return
+
+        # Counters for progress reports, including work done before a restart
+        sent = job.sent
+        failed = job.failed
+        started_at = time.monotonic()
+        done_at_start = sent + failed
+
+        # Results are checkpointed in small batches so a restart resumes
+        # right after the last delivered recipient
+        buffer: list[tuple[int, DeliveryStatus, Optional[str], Optional[list[int]]]] = []
+        # Ids of the copies, kept so the broadcast can be edited or deleted later
+        copies: dict[int, list[int]] = {}
+        unreachable: list[int] = []
+        # Old chat_id -> supergroup id of groups upgraded during this run
+        migrated: dict[int, int] = {}
+        flush_lock = asyncio.Lock()
+        # Early checkpoints started from on_result; referenced so they aren't garbage collected
+        flushes: set[asyncio.Task] = set()
+
+        async def flush():
+            async with flush_lock:
+                batch = buffer[:]
+                del buffer[:]
+                dead = unreachable[:]
+                del unreachable[:]
+                try:
+                    await self.db.save_delivery_results(job_id, batch)
+                except Exception as e:
+                    buffer.extend(batch)
+                    logger.error(f"Broadcast job {job_id} checkpoint failed: {e}")
+                try:
+                    if dead:
+                        await self._mark_unreachable(job, dead)
+                except Exception as e:
+                    unreachable.extend(dead)
+                    logger.error(f"Broadcast job {job_id} could not mark unreachable chats: {e}")
+
+        def logged(send):
+            async def send_and_log(chat_id: int):
+                try:
+                    copies[chat_id] = await send(chat_id)
+                except TelegramMigrateToChat as e:
+                    # Group became a supergroup: move it (and its delivery row) and resend
+                    if not await self.db.migrate_group(chat_id, e.migrate_to_chat_id):
+                        raise
+                    logger.info(f"Group {chat_id} migrated to {e.migrate_to_chat_id}")
+                    migrated[chat_id] = e.migrate_to_chat_id
+                    copies[chat_id] = await send(e.migrate_to_chat_id)
+            return send_and_log
+
+        def on_result(chat_id: int, error: Optional[Exception]):
+            nonlocal sent, failed
+            if chat_id in migrated:
+                new_chat_id = migrated.pop(chat_id)
+                if chat_id in copies:
+                    copies[new_chat_id] = copies.pop(chat_id)
+                chat_id = new_chat_id
+            if error is None:
+                sent += 1
+                buffer.append((chat_id, DeliveryStatus.SENT, None, copies.pop(chat_id, None)))
+            else:
+                failed += 1
+                buffer.append((chat_id, DeliveryStatus.FAILED, str(error)[:255], None))
+                if is_permanent_error(error):
+                    unreachable.append(chat_id)
+            if len(buffer) >= self.checkpoint_size and not flush_lock.locked():
+                task = asyncio.create_task(flush())
+                flushes.add(task)
+                task.add_done_callback(flushes.discard)
+
+        async def checkpointer():
+            while True:
+                await asyncio.sleep(self.checkpoint_interval)
+                await flush()
+
+        async def progress_reporter():
+            # Throttled so status edits don't compete with delivery
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                elapsed = time.monotonic() - started_at
+                rate = (sent + failed - done_at_start) / elapsed if elapsed else 0.0
+                await self._report_progress(job, sent, failed, rate)
+
+        helpers = [
+            asyncio.create_task(checkpointer()),
+            asyncio.create_task(progress_reporter())
+        ]
+        # Spread scheduled jobs evenly over their window
+        max_rate = None
+        if job.spread_minutes and job.total:
+            max_rate = job.total / (job.spread_minutes * 60)
+
+        async def deliver():
+            if not job.template:
+                pending = await self.db.get_pending_deliveries(job_id)
+                await self.broadcaster.run(
+                    pending,
+                    logged(self.make_sender(job)),
+                    on_result=on_result,
+                    max_rate=max_rate
+                )
+                return
+
+            # Personalized text: the template is parsed once, each batch fetches
+            # only the columns it uses and texts are rendered right before sending
+            template = MessageTemplate(job.template)
+            async for batch in self.db.iter_pending_template_rows(job_id, template.fields):
+                values = dict(batch)
+                await self.broadcaster.run(
+                    values.keys(),
+                    logged(self.make_sender(job, render=lambda chat_id: template.render(values[chat_id]))),
+                    on_result=on_result,
+                    max_rate=max_rate
+                )
+
+        final_status = BroadcastStatus.COMPLETED
+        try:
+            await deliver()
+        except asyncio.CancelledError:
+            # Shutdown keeps the job running for resume, admin cancel stops it
+            if job_id not in self._cancelled:
+                raise
+        except Exception as e:
+            # Don't leave the job RUNNING (resume would hit the same error), tell the admin
+            logger.exception(f"Broadcast job {job_id} failed: {e}")
+            final_status = BroadcastStatus.FAILED
+        finally:
+            for helper in helpers:
+                helper.cancel()
+            await asyncio.gather(*helpers, return_exceptions=True)
+            # Let started checkpoints finish; errors are logged, not lost
+            for result in await asyncio.gather(*flushes, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Broadcast job {job_id} checkpoint task failed: {result}")
+            await flush()
+
+        try:
+            if job_id not in self._cancelled:
+                await self.db.set_broadcast_job_status(
+                    job_id, final_status, from_statuses=(BroadcastStatus.RUNNING,)
+                )
+            await self._report(job_id)
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled:
+                raise
+            # Cancelled right after delivery; cancel() already stored CANCELLED
+            await self._report(job_id)
+
+    async def _report_progress(self, job: BroadcastJob, sent: int, failed: int, rate: float) -> None:
+        """Edit the admin's status message with live counters"""
+        if not job.status_chat_id:
+            return
+
+        remaining = max(job.total - sent - failed, 0)
+        eta = format_duration(remaining / rate) if rate > 0 else "—"
+        try:
+            await self.bot.edit_message_text(
+                f"📤 <b>Yuborilmoqda...</b>\n\n"
+                f"├ Muvaffaqiyatli: <b>{sent}</b>\n"
+                f"├ Muvaffaqiyatsiz: <b>{failed}</b>\n"
+                f"├ Jami: <b>{job.total}</b>\n"
+                f"├ Tezlik: <b>{rate:.1f}</b> ta/sek\n"
+                f"└ Qolgan vaqt: <b>{eta}</b>",
+                chat_id=job.status_chat_id,
+                message_id=job.status_message_id,
+                reply_markup=get_broadcast_progress_keyboard(job.id)
+            )
+        except Exception as e:
+            logger.debug(f"Could not update progress of broadcast job {job.id}: {e}")
+
+    async def _report(self, job_id: int) -> None:
+        """Show final results in the admin's status message"""
+        job = await self.db.get_broadcast_job(job_id)
+        if not job or not job.status_chat_id:
+            return
+
+        if job.target == BroadcastTarget.USERS:
+            target_text = "👥 Target: <b>Users</b>"
+            done_text = "✨ Barcha foydalanuvchilarga yetkazildi!"
+        else:
+            target_text = "💬 Target: <b>Groups/Channels</b>"
+            done_text = "✨ Barcha guruh va kanallarga yetkazildi!"
+
+        if job.status == BroadcastStatus.CANCELLED and job.started_at is None:
+            # Recipients are picked when the job starts, so there are no counters yet
+            try:
+                await self.bot.edit_message_text(
+                    f"⏹ <b>Broadcast bekor qilindi!</b>\n\n"
+                    f"{target_text}\n\n"
+                    f"Broadcast boshlanishidan oldin bekor qilindi, hech kimga yuborilmadi.",
+                    chat_id=job.status_chat_id,
+                    message_id=job.status_message_id
+                )
+            except Exception as e:
+                logger.warning(f"Could not report broadcast job {job_id}: {e}")
+            return
+
+        if job.status == BroadcastStatus.CANCELLED:
+            title = "⏹ <b>Broadcast to'xtatildi!</b>"
+            done_text = f"⏳ Yuborilmagan: <b>{job.total - job.sent - job.failed}</b>"
+        elif job.status == BroadcastStatus.FAILED:
+            title = "❌ <b>Broadcast xatolik bilan to'xtadi!</b>"
+            done_text = f"⏳ Yuborilmagan: <b>{job.total - job.sent - job.failed}</b>"
+        else:
+            title = "✅ <b>Broadcast yakunlandi!</b>"
+
+        try:
+            await self.bot.edit_message_text(
+                f"{title}\n\n"
+                f"{target_text}\n\n"
+                f"📊 Natijalar:\n"
+                f"├ Muvaffaqiyatli: <b>{job.sent}</b>\n"
+                f"├ Muvaffaqiyatsiz: <b>{job.failed}</b>\n"
+                f"└ Jami: <b>{job.total}</b>\n\n"
+                f"{done_text}",
+                chat_id=job.status_chat_id,
+                message_id=job.status_message_id,
+                reply_markup=get_broadcast_manage_keyboard(job.id) if job.sent else None
+            )
+        except Exception as e:
+            logger.warning(f"Could not report broadcast job {job_id}: {e}")
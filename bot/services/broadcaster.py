@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Optional
+from aiogram.exceptions import (
+    TelegramRetryAfter,
+    TelegramNetworkError,
+    TelegramServerError,
+    TelegramForbiddenError,
+    TelegramBadRequest,
+    TelegramNotFound,
+    TelegramMigrateToChat
+)
+from bot.services.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SendFunc = Callable[[int], Awaitable[object]]
+ResultCallback = Callable[[int, Optional[Exception]], None]
+
+
+# Bad request descriptions meaning the chat itself is gone
+PERMANENT_BAD_REQUESTS = (
+    "chat not found",
+    "user not found",
+    "user is deactivated",
+    "peer_id_invalid",
+    "group chat was deactivated",
+)
+
+# The bot is still in the chat but may not write right now (muted, slow mode,
+# restricted) - an ordinary failure, the chat stays a recipient
+RIGHTS_ERRORS = (
+    "have no rights to send",
+    "not enough rights",
+    "chat_write_forbidden",
+)
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """True if the chat can't receive messages anymore (blocked, kicked, deleted).
+
+    A migrated group is permanent for its old chat_id only; BroadcastManager
+    moves the group to the new supergroup id before it gets here.
+    """
+    if isinstance(error, (TelegramBadRequest, TelegramForbiddenError)):
+        if any(text in error.message.lower() for text in RIGHTS_ERRORS):
+            return False
+    if isinstance(error, (TelegramForbiddenError, TelegramNotFound, TelegramMigrateToChat)):
+        return True
+    if isinstance(error, TelegramBadRequest):
+        message = error.message.lower()
+        return any(text in message for text in PERMANENT_BAD_REQUESTS)
+    return False
+
+
+@dataclass
+class BroadcastResult:
+    """Broadcast counters"""
+    total: int = 0
+    success: int = 0
+    failed: int = 0
+
+
+class Broadcaster:
+    """Sends one payload to many chats with a bounded worker pool.
+
+    Rate limits are enforced by the bot session's OutboundScheduler, so
+    the pool only decides how many requests are in flight.
+    """
+
+    def __init__(self, workers: int = 20, max_retries: int = 3):
+        self.workers = workers
+        self.max_retries = max_retries
+
+    async def _deliver(self, chat_id: int, send: SendFunc) -> None:
+        """Send to one chat, waiting out flood limits and retrying network errors"""
+        attempt = 0
+        while True:
+            try:
+                await send(chat_id)
+                return
+            except TelegramRetryAfter as e:
+                # The scheduler gave up retrying; wait and try again,
+                # it doesn't count as a failed attempt
+                await asyncio.sleep(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.debug(f"Transient error for {chat_id}, retry {attempt}: {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        send: SendFunc,
+        result: BroadcastResult,
+        on_result: Optional[ResultCallback],
+        pacing: Optional[TokenBucket]
+    ) -> None:
+        while True:
+            chat_id = await queue.get()
+            error = None
+            try:
+                if pacing:
+                    await pacing.acquire()
+                await self._deliver(chat_id, send)
+                result.success += 1
+            except Exception as e:
+                error = e
+                result.failed += 1
+                logger.debug(f"Broadcast to {chat_id} failed: {e}")
+            if on_result:
+                on_result(chat_id, error)
+            queue.task_done()
+
+    async def run(
+        self,
+        chat_ids: Iterable[int],
+        send: SendFunc,
+        on_result: Optional[ResultCallback] = None,
+        max_rate: Optional[float] = None
+    ) -> BroadcastResult:
+        """Call send(chat_id) for every chat, respecting the rate limits.
+
+        on_result(chat_id, error) is called after every attempt; error is None on success.
+        max_rate (msg/s) slows this run down below the shared limits, e.g. to spread
+        a scheduled broadcast over a time window.
+        """
+        result = BroadcastResult()
+        pacing = TokenBucket(max_rate, capacity=1) if max_rate else None
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [
+            asyncio.create_task(self._worker(queue, send, result, on_result, pacing))
+            for _ in range(self.workers)
+        ]
+        try:
+            for chat_id in chat_ids:
+                result.total += 1
+                await queue.put(chat_id)
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return result
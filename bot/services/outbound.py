@@ -0,0 +1,76 @@
+import enum
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from bot.services.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Bot API methods that count against the message limits
+LIMITED_METHOD_PREFIXES = ("send", "copy", "forward", "edit", "delete")
+
+
+class Priority(enum.IntEnum):
+    """Outbound traffic classes, lower goes first"""
+    INTERACTIVE = 0  # Replies to the user who is waiting
+    NOTIFICATION = 1  # Messages to other users triggered by an action
+    BULK = 2  # Broadcasts and their status updates
+
+
+# Priority of requests made from the current task; handlers are interactive
+outbound_priority: ContextVar[Priority] = ContextVar("outbound_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority(value: Priority):
+    """Send with the given priority inside the block"""
+    token = outbound_priority.set(value)
+    try:
+        yield
+    finally:
+        outbound_priority.reset(token)
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """Session middleware every Bot API request goes through.
+
+    Messages wait for the per-chat and global limits of the shared
+    RateLimiter; interactive replies are handed tokens before bulk traffic.
+    A flood wait pauses all sending and the request is retried.
+    """
+
+    def __init__(self, limiter: RateLimiter, max_flood_retries: int = 5):
+        self.limiter = limiter
+        self.max_flood_retries = max_flood_retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not method.__api_method__.startswith(LIMITED_METHOD_PREFIXES):
+            # getUpdates, answerCallbackQuery, getChat... are not message-limited
+            return await make_request(bot, method)
+
+        current = outbound_priority.get()
+        attempt = 0
+        while True:
+            await self.limiter.acquire(chat_id, current)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                # Flood wait applies to the whole token - pause every sender
+                if self.limiter.paused_until <= time.monotonic():
+                    logger.warning(f"Flood wait {e.retry_after}s on {method.__api_method__}, pausing sending")
+                self.limiter.pause(e.retry_after)
+                attempt += 1
+                if attempt > self.max_flood_retries:
+                    raise
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Optional, Union
+
+
+class TokenBucket:
+    """Token bucket that allows `rate` operations per `period` seconds"""
+
+    def __init__(self, rate: float, period: float = 1.0, capacity: Optional[float] = None):
+        self.fill_rate = rate / period
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        # The lock keeps waiters in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+
+class PriorityTokenBucket(TokenBucket):
+    """Token bucket that hands tokens to waiters by priority (lower first), FIFO within one"""
+
+    def __init__(self, rate: float, period: float = 1.0, capacity: Optional[float] = None):
+        super().__init__(rate, period, capacity)
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def acquire(self, priority: int = 0) -> None:
+        """Wait until a token is available for this priority and take it"""
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            # Skip waiters that were cancelled meanwhile
+            if not future.done():
+                self.tokens -= 1
+                future.set_result(None)
+
+
+class ChatRateLimiter:
+    """Per-chat token buckets: private chats 1 msg/s, groups and channels 20 msg/min.
+
+    Slots are reserved in call order, so messages to one chat keep their order.
+    In private chats burst messages may go out back to back before the spacing
+    kicks in; groups get no burst, it would overrun their per-minute budget.
+    """
+
+    def __init__(self, private_interval: float = 1.0, group_interval: float = 3.0, burst: int = 1):
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self.burst = max(burst, 1)
+        # Theoretical arrival time of the next message per chat (GCRA)
+        self._next_allowed: dict[Union[int, str], float] = {}
+
+    def _limits(self, chat_id: Union[int, str]) -> tuple[float, int]:
+        """Spacing and burst for chat"""
+        # Group, supergroup and channel ids are negative in the Bot API, @usernames are channels
+        if isinstance(chat_id, str) or chat_id < 0:
+            return self.group_interval, 1
+        return self.private_interval, self.burst
+
+    def _prune(self, now: float) -> None:
+        self._next_allowed = {
+            chat_id: allowed for chat_id, allowed in self._next_allowed.items() if allowed > now
+        }
+
+    async def acquire(self, chat_id: Union[int, str]) -> None:
+        """Reserve the next free slot for chat and wait for it"""
+        now = time.monotonic()
+        if len(self._next_allowed) > 10000:
+            self._prune(now)
+
+        interval, burst = self._limits(chat_id)
+        next_allowed = max(now, self._next_allowed.get(chat_id, 0.0))
+        slot = max(now, next_allowed - (burst - 1) * interval)
+        self._next_allowed[chat_id] = next_allowed + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class RateLimiter:
+    """Global + per-chat limits shared by everything sending with one bot token"""
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        private_interval: float = 1.0,
+        group_interval: float = 3.0,
+        chat_burst: int = 1
+    ):
+        # No burst: a full bucket on top of the refill would double the first second
+        self.global_bucket = PriorityTokenBucket(global_rate, capacity=1)
+        self.chats = ChatRateLimiter(private_interval, group_interval, chat_burst)
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Stop all sending for a while (flood wait from Telegram)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def _wait_pause(self) -> None:
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def acquire(self, chat_id: Union[int, str], priority: int = 0) -> None:
+        """Wait until a message to chat_id is allowed; lower priority value goes first"""
+        await self._wait_pause()
+        await self.chats.acquire(chat_id)
+        await self.global_bucket.acquire(priority)
+        # A flood wait may have started while we were queued
+        await self._wait_pause()
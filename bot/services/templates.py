@@ -0,0 +1,50 @@
+import html
+from string import Formatter
+from typing import Any, Optional
+
+# User columns that may be used in broadcast templates
+TEMPLATE_FIELDS = (
+    "preferred_name",
+    "first_name",
+    "last_name",
+    "username",
+    "coins",
+    "referral_code",
+)
+
+# Sample values used to validate format specs at compile time
+_SAMPLE_VALUES = {"coins": 0}
+
+
+class MessageTemplate:
+    """Broadcast text with {field} placeholders, parsed once and rendered per recipient"""
+
+    def __init__(self, text: str):
+        self.text = text
+        # (literal, field, format_spec) parts; raises ValueError on broken braces
+        self._parts: list[tuple[str, Optional[str], str]] = []
+        fields = []
+        for literal, field, format_spec, conversion in Formatter().parse(text):
+            if field is not None:
+                if field not in TEMPLATE_FIELDS:
+                    raise ValueError(f"Unknown template field: {field or '{}'}")
+                if conversion:
+                    raise ValueError(f"Conversions are not supported: {field}!{conversion}")
+                if format_spec:
+                    format(_SAMPLE_VALUES.get(field, ""), format_spec)
+                if field not in fields:
+                    fields.append(field)
+            self._parts.append((literal, field, format_spec or ""))
+        self.fields: tuple[str, ...] = tuple(fields)
+
+    def render(self, values: dict[str, Any]) -> str:
+        """Fill placeholders; values are HTML-escaped, missing ones become empty"""
+        chunks = []
+        for literal, field, format_spec in self._parts:
+            chunks.append(literal)
+            if field is None:
+                continue
+            value = values.get(field)
+            if value is not None:
+                chunks.append(html.escape(format(value, format_spec)))
+        return "".join(chunks)
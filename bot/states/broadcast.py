@@ -3,3 +3,7 @@ from aiogram.fsm.state import State, StatesGroup
 
 class BroadcastStates(StatesGroup):
     waiting_for_content = State()
+    waiting_for_template = State()
+    waiting_for_schedule = State()
+    waiting_for_segment = State()
+    waiting_for_edit = State()